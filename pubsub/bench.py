@@ -0,0 +1,113 @@
+import sys
+import json
+import time
+
+from pubsub_topic import topic_types
+from cyclonedds.util import duration
+
+
+# Synthetic keyval of every type, arrays have a fixed length and the string sequence holds at most 100 elements
+def bench_value(name, size):
+    if name == "int":
+        return size
+    elif name == "str":
+        return "x" * size
+    elif name == "int_array":
+        return list(range(3))
+    elif name == "str_array":
+        return ["x" * size] * 5
+    elif name == "int_seq":
+        return list(range(size))
+    elif name == "str_seq":
+        return ["x" * size] * min(size, 100)
+    else:
+        return bytes(size)
+
+
+def percentile(values, p):
+    return values[min(int(len(values) * p / 100), len(values) - 1)] if values else None
+
+
+class Bench:
+    def __init__(self, manager, count, size):
+        self.manager = manager
+        self.count = count
+        self.size = size
+        self.sent = {}      # seq -> send time in ns
+        self.latency = []   # one-way latency in ns of every received sample
+        self.last_receive = None
+
+    # Record the latency of the samples received so far
+    def receive(self):
+        for sample in self.manager.take():
+            now = time.perf_counter_ns()
+            sent = self.sent.pop(sample.seq, None)
+            if sent is not None:
+                self.latency.append(now - sent)
+                self.last_receive = now
+
+    def run(self, name):
+        self.sent.clear()
+        self.latency = []
+        value = bench_value(name, self.size)
+        self.manager.writer(name)  # Don't count entity creation as write time
+
+        time_start = time.perf_counter_ns()
+        for i in range(self.count):
+            self.sent[self.manager.seq + 1] = time.perf_counter_ns()
+            self.manager.write_value(name, value)
+            if i % 100 == 99:
+                self.receive()
+        write_time = time.perf_counter_ns() - time_start
+
+        # Wait for the samples in flight, stop when nothing arrives for a second
+        while self.sent:
+            if not self.manager.waitset.wait(duration(seconds=1)):
+                break
+            self.receive()
+
+        latency = sorted(self.latency)
+        receive_time = (self.last_receive or time_start) - time_start
+        return {
+            "type": name,
+            "size": self.size,
+            "count": self.count,
+            "received": len(latency),
+            "lost": self.count - len(latency),
+            "write_rate": self.count / write_time * 1e9 if write_time else None,
+            "receive_rate": len(latency) / receive_time * 1e9 if receive_time else None,
+            "latency_us": {
+                "p50": percentile(latency, 50) / 1e3 if latency else None,
+                "p90": percentile(latency, 90) / 1e3 if latency else None,
+                "p99": percentile(latency, 99) / 1e3 if latency else None,
+                "max": latency[-1] / 1e3 if latency else None
+            }
+        }
+
+
+def run_bench(args, managers, qos):
+    results = {
+        "topics": args.topic,
+        "qos": [str(policy) for policy in qos] if qos else [],
+        "results": []
+    }
+    for manager in managers:
+        bench = Bench(manager, args.bench_count, args.bench_size)
+        for name in args.types or topic_types:
+            results["results"].append({"topic": manager.topic_name, **bench.run(name)})
+
+    write_results(results, args.bench_output)
+    return 0
+
+
+# Write results as JSON to a file or stdout
+def write_results(results, filename):
+    if filename:
+        try:
+            with open(filename, 'w') as f:
+                json.dump(results, f, indent=4)
+        except OSError:
+            raise Exception(f"Could not open file {filename}")
+    else:
+        json.dump(results, sys.stdout, indent=4)
+        print()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+import gc
+import sys
+import time
+import argparse
+
+from util import create_parser
+from bench import bench_value
+from pubsub_topic import TopicManager, topic_types
+from cyclonedds.core import WaitSet
+from cyclonedds.domain import DomainParticipant
+
+
+# Count the collections of the garbage collector and the time spent in them
+class GcMonitor:
+    def __init__(self):
+        self.collections = 0
+        self.pause = 0
+        self.time_start = None
+
+    def __call__(self, phase, info):
+        if phase == "start":
+            self.time_start = time.perf_counter_ns()
+        else:
+            self.collections += 1
+            self.pause += time.perf_counter_ns() - self.time_start
+
+
+# Write count samples through write, report the time and garbage collection per write
+def bench(label, write, count):
+    monitor = GcMonitor()
+    gc.collect()
+    gc.callbacks.append(monitor)
+    time_start = time.perf_counter_ns()
+    for i in range(count):
+        write(i)
+    elapsed = time.perf_counter_ns() - time_start
+    gc.callbacks.remove(monitor)
+    print(f"{label:>24}: {elapsed / count:8.0f} ns/write, {monitor.collections} gc collections, " +
+          f"{monitor.pause / 1e6:.3f} ms gc pause")
+
+
+def main(sys_args):
+    parser = argparse.ArgumentParser(description="Compare writing a new sample per write with the reused samples " +
+                                                 "of TopicManager")
+    parser.add_argument("-n", "--count", type=int, default=100000, help="Number of writes per type (default: 100000)")
+    parser.add_argument("--size", type=int, default=16, help="Size of the strings and sequences (default: 16)")
+    args = parser.parse_args(sys_args)
+
+    dp = DomainParticipant(0)
+    manager = TopicManager(create_parser(["-T", "bench_pool", "--lazy"]), dp, [None] * 5, WaitSet(dp), "bench_pool")
+    for name, datastruct in topic_types.items():
+        value = bench_value(name, args.size)
+        writer = manager.writer(name)
+        bench(f"{name} new sample", lambda seq: writer.write(datastruct(seq, value)), args.count)
+        bench(f"{name} reused sample", lambda seq: manager.write_value(name, value), args.count)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
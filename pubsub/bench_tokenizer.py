@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+import sys
+import time
+import argparse
+
+from tokenizer import Tokenizer
+
+
+line = "test 420 [4,2,0] ['test','str','array','data','struct'] [-1,183] ['test','string','sequence']\n"
+
+
+# The input parsing of pubsub before the tokenizer was introduced
+def eval_values(lines):
+    values = []
+    for line in lines:
+        for text in line.split():
+            try:
+                values.append(eval(text))
+            except NameError:
+                values.append(text.rstrip("\n"))
+    return values
+
+
+def tokenizer_values(lines):
+    tokenizer = Tokenizer()
+    values = []
+    for line in lines:
+        values += tokenizer.feed(line)
+    values += tokenizer.finish()
+    return values
+
+
+def bench(name, parse, lines, repeat):
+    best = None
+    for _ in range(repeat):
+        time_start = time.perf_counter()
+        values = parse(lines)
+        elapsed = time.perf_counter() - time_start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{name:>9}: {len(values)} values in {best:.3f}s ({len(values) / best:.0f} values/s)")
+    return values, best
+
+
+def main(sys_args):
+    parser = argparse.ArgumentParser(description="Compare the pubsub tokenizer with the former eval() input parsing")
+    parser.add_argument("-n", "--lines", type=int, default=100000, help="Number of input lines (default: 100000)")
+    parser.add_argument("--repeat", type=int, default=3, help="Take the best of this many runs (default: 3)")
+    args = parser.parse_args(sys_args)
+
+    lines = [line] * args.lines
+    eval_result, eval_time = bench("eval", eval_values, lines, args.repeat)
+    tokenizer_result, tokenizer_time = bench("tokenizer", tokenizer_values, lines, args.repeat)
+    if eval_result != tokenizer_result:
+        raise Exception("The tokenizer and eval() results differ")
+    print(f"Speedup: {eval_time / tokenizer_time:.1f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -2,33 +2,31 @@ from cyclonedds.core import Qos
 from entity_qos import EntityQosMapper
 
 
-eqos = [None] * 5
+# The entities in the order of the entity qos list, entity i is bit i of a mask
+entities = ["topic", "publisher", "subscriber", "datawriter", "datareader"]
+all_entities = (1 << len(entities)) - 1
 
-
-def entity_qos(qos, entity):
-    if entity == "topic":
-        eqos[0] = check_entity_qos("topic", EntityQosMapper.topic, qos)
-    elif entity == "publisher":
-        eqos[1] = check_entity_qos("publisher", EntityQosMapper.pubsub, qos)
-    elif entity == "subscriber":
-        eqos[2] = check_entity_qos("subscriber", EntityQosMapper.pubsub, qos)
-    elif entity == "datawriter":
-        eqos[3] = check_entity_qos("datawriter", EntityQosMapper.writer, qos)
-    elif entity == "datareader":
-        eqos[4] = check_entity_qos("datareader", EntityQosMapper.reader, qos)
-    else:  # qos-all
-        for e in ["topic", "publisher", "subscriber", "datawriter", "datareader"]:
-            entity_qos(qos, e)
-    return eqos
+# Policy scope -> bitmask of the entities the policy applies to
+scope_entities = {}
+for bit, mapper in enumerate([EntityQosMapper.topic, EntityQosMapper.pubsub, EntityQosMapper.pubsub,
+                              EntityQosMapper.writer, EntityQosMapper.reader]):
+    for policy in mapper:
+        scope = policy.replace("Policy.", "")
+        scope_entities[scope] = scope_entities.get(scope, 0) | 1 << bit
 
 
-def check_entity_qos(e, eqos_mapper, qos):
-    eq = []
+# Split a qos into the qos of the topic, publisher, subscriber, datawriter and datareader in a single pass.
+# Entities that aren't selected get None, so they keep the default qos. Returns a new list on every call.
+def entity_qos(qos, entity):
+    selected = all_entities if entity in (None, "all") else 1 << entities.index(entity)
+    policies = [[] for _ in entities]
     for q in qos:
-        policy_scope = f"Policy.{q.__scope__}"
-
-        if policy_scope in eqos_mapper:
-            eq.append(q)
-        else:
-            print(f"The {q} is not applicable for {e}, will be ignored.")
-    return Qos(*eq)
+        applicable = scope_entities.get(q.__scope__, 0)
+        for bit, name in enumerate(entities):
+            if not selected >> bit & 1:
+                continue
+            if applicable >> bit & 1:
+                policies[bit].append(q)
+            else:
+                print(f"The {q} is not applicable for {name}, will be ignored.")
+    return [Qos(*policies[bit]) if selected >> bit & 1 else None for bit in range(len(entities))]
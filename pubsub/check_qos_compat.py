@@ -0,0 +1,136 @@
+import fnmatch
+
+from cyclonedds.qos import Policy
+from cyclonedds.util import duration
+
+from parse_qos import dds_infinity
+
+
+# Kind of a policy with kinds, e.g. "Reliable" for Policy.Reliability.Reliable(max_blocking_time=10)
+def kind(policy):
+    return str(policy).split("(")[0].split(".")[-1]
+
+
+def fmt_duration(ns):
+    return "infinity" if ns >= dds_infinity else f"{ns / 1e9:g}s"
+
+
+# Kinds in increasing order of strength: an offered kind satisfies a requested kind that isn't stronger
+def check_kind(kinds):
+    def check(offered, requested):
+        if kinds.index(kind(offered)) < kinds.index(kind(requested)):
+            return f"{kind(requested)} requested but {kind(offered)} offered"
+    return check
+
+
+def check_deadline(offered, requested):
+    if offered.deadline > requested.deadline:
+        return (f"a period of {fmt_duration(requested.deadline)} requested but " +
+                f"{fmt_duration(offered.deadline)} offered")
+
+
+def check_latency_budget(offered, requested):
+    if offered.budget > requested.budget:
+        return f"a budget of {fmt_duration(requested.budget)} requested but {fmt_duration(offered.budget)} offered"
+
+
+def check_liveliness(offered, requested):
+    problem = check_kind(["Automatic", "ManualByParticipant", "ManualByTopic"])(offered, requested)
+    if problem:
+        return problem
+    if offered.lease_duration > requested.lease_duration:
+        return (f"a lease duration of {fmt_duration(requested.lease_duration)} requested but " +
+                f"{fmt_duration(offered.lease_duration)} offered")
+
+
+def check_ownership(offered, requested):
+    if kind(offered) != kind(requested):
+        return f"{kind(requested)} requested but {kind(offered)} offered"
+
+
+def check_presentation(offered, requested):
+    problem = check_kind(["Instance", "Topic", "Group"])(offered, requested)
+    if problem:
+        return f"access scope {problem}"
+    if requested.coherent_access and not offered.coherent_access:
+        return "coherent access requested but not offered"
+    if requested.ordered_access and not offered.ordered_access:
+        return "ordered access requested but not offered"
+
+
+# Not requested-vs-offered, but without a common partition the endpoints never match either.
+# Either side may give a partition as a wildcard pattern, e.g. "sensor*" matches "sensor1".
+def check_partition(offered, requested):
+    if not any(fnmatch.fnmatchcase(o, r) or fnmatch.fnmatchcase(r, o)
+               for o in offered.partitions for r in requested.partitions):
+        return f"partitions {list(requested.partitions)} requested but {list(offered.partitions)} offered"
+
+
+# Policy scope -> check of the offered against the requested policy, returns the problem or None
+rxo_checks = {
+    "Durability": check_kind(["Volatile", "TransientLocal", "Transient", "Persistent"]),
+    "PresentationAccessScope": check_presentation,
+    "Deadline": check_deadline,
+    "LatencyBudget": check_latency_budget,
+    "Ownership": check_ownership,
+    "Liveliness": check_liveliness,
+    "Reliability": check_kind(["BestEffort", "Reliable"]),
+    "DestinationOrder": check_kind(["ByReceptionTimestamp", "BySourceTimestamp"]),
+    "Partition": check_partition
+}
+
+# Policies of an entity that doesn't set them, the writer and reader only differ in reliability
+default_policies = {
+    "Durability": Policy.Durability.Volatile,
+    "PresentationAccessScope": Policy.PresentationAccessScope.Instance(coherent_access=False, ordered_access=False),
+    "Deadline": Policy.Deadline(deadline=dds_infinity),
+    "LatencyBudget": Policy.LatencyBudget(budget=0),
+    "Ownership": Policy.Ownership.Shared,
+    "Liveliness": Policy.Liveliness.Automatic(lease_duration=dds_infinity),
+    "DestinationOrder": Policy.DestinationOrder.ByReceptionTimestamp,
+    "Partition": Policy.Partition(partitions=("",))
+}
+default_writer_reliability = Policy.Reliability.Reliable(max_blocking_time=duration(milliseconds=100))
+default_reader_reliability = Policy.Reliability.BestEffort
+
+
+# Effective policies of a writer or reader: the defaults, overridden by the topic, the publisher or
+# subscriber and the writer or reader qos, in that order
+def effective_policies(reliability, *qoses):
+    policies = dict(default_policies, Reliability=reliability)
+    for qos in qoses:
+        for policy in qos or []:
+            policies[policy.__scope__] = policy
+    return policies
+
+
+# Check the qos offered by a writer against the qos requested by a reader, both given as the entity qos
+# list of entity_qos. Returns one explanation per incompatible policy.
+def check_compatibility(writer_eqos, reader_eqos):
+    offered = effective_policies(default_writer_reliability, writer_eqos[0], writer_eqos[1], writer_eqos[3])
+    requested = effective_policies(default_reader_reliability, reader_eqos[0], reader_eqos[2], reader_eqos[4])
+    problems = []
+    for scope, check in rxo_checks.items():
+        problem = check(offered[scope], requested[scope])
+        if problem:
+            problems.append(f"{scope}: {problem}")
+    return problems
+
+
+# Check the local writers against the local readers, and both against the endpoints of every remote
+# entity qos list, before any entity is created. Incompatibilities are warnings unless strict.
+def check_qos(eqos, remotes=(), strict=False):
+    pairs = [("the local datawriter", eqos, "the local datareader", eqos)]
+    for name, remote in remotes:
+        pairs.append(("the local datawriter", eqos, f"the datareader of {name}", remote))
+        pairs.append((f"the datawriter of {name}", remote, "the local datareader", eqos))
+    messages = []
+    for writer, writer_eqos, reader, reader_eqos in pairs:
+        problems = check_compatibility(writer_eqos, reader_eqos)
+        if problems:
+            messages.append(f"The Qos requested by {reader} is incompatible with the Qos offered by {writer}:\n" +
+                            "\n".join(f"    {problem}" for problem in problems))
+    if messages and strict:
+        raise SystemExit("Error: " + "\n".join(messages))
+    for message in messages:
+        print(f"WARNING: {message}")
@@ -0,0 +1,212 @@
+import sys
+import time
+import datetime
+
+from workers import seq_bits
+from histogram import LatencyHistogram
+from cyclonedds.builtin import BuiltinDataReader, BuiltinTopicDcpsPublication
+
+
+# Approximate CDR size of a field value: 8 bytes per number, strings and sequences with their length
+def payload_size(value):
+    if type(value) is int or type(value) is float:
+        return 8
+    elif type(value) is bool:
+        return 1
+    elif type(value) is str:
+        return len(value.encode()) + 5
+    elif type(value) is list:
+        return sum(payload_size(v) for v in value) + 4
+    elif hasattr(value, "nbytes"):  # NumPy array
+        return value.nbytes + 4
+    elif hasattr(value, "__dict__"):  # Nested struct of a user type
+        return sum(payload_size(v) for v in vars(value).values())
+    return len(value) + 4
+
+
+# Loss detection on the seq of one publisher. Samples may arrive out of order within the window,
+# a seq that is still missing once window newer samples arrived is counted as lost. A seq below the
+# first one that arrived was written before it and is late, not a duplicate.
+class SeqTracker:
+    def __init__(self, window=1024):
+        self.window = window
+        self.first = self.highest = None
+        self.missing = {}  # seq -> None, in increasing order
+        self.late = set()  # seqs below the first one that arrived within the window
+        self.duplicates = self.out_of_order = self.lost = 0
+
+    def add(self, seq):
+        if self.highest is None:
+            self.first = self.highest = seq
+        elif seq > self.highest:
+            first = max(self.highest + 1, seq - self.window)
+            self.lost += first - self.highest - 1  # Gaps larger than the window are lost right away
+            for missing in range(first, seq):
+                self.missing[missing] = None
+            self.highest = seq
+            self.expire(seq - self.window)
+        elif seq in self.missing:
+            del self.missing[seq]
+            self.out_of_order += 1
+        elif seq < self.highest - self.window:  # Already counted as lost, or too late to tell
+            self.out_of_order += 1
+        elif seq < self.first and seq not in self.late:
+            self.late.add(seq)
+            self.out_of_order += 1
+        else:
+            self.duplicates += 1
+
+    # Count the missing samples below seq as lost
+    def expire(self, seq):
+        missing = self.missing
+        while missing:
+            first = next(iter(missing))
+            if first >= seq:
+                break
+            del missing[first]
+            self.lost += 1
+
+
+# Counters of the received samples per topic and per publisher, see report for the compact form.
+# TopicManager.seq numbers the samples of all types of a topic together, so the seq is tracked per topic and
+# publisher: the participant of the writers, looked up in the discovery data by publication handle, and
+# the worker, as the workers of a process start their seq at index << seq_bits.
+class ReceiveCounters:
+    def __init__(self, interval, dp):
+        self.interval = interval
+        self.last_report = time.monotonic()
+        self.publications = BuiltinDataReader(dp, BuiltinTopicDcpsPublication)
+        self.participants = {}  # publication handle -> participant key
+        self.pending = {}  # publication handle -> [(topic, seq, bytes)] of a writer that isn't discovered yet
+        self.topics = {}  # topic -> {(participant key, worker) -> SeqTracker}
+        self.publishers = {}  # (topic, participant key, worker) -> [received, bytes]
+        self.writers = set()  # (topic, publication handle)
+        self.interval_counts = {}  # topic -> [received, bytes] since the last report
+        self.reported = {}  # topic -> (duplicates, out of order, lost) at the last report
+
+    # Participant of a writer, None while the writer isn't discovered yet
+    def participant(self, handle):
+        if handle not in self.participants:
+            while True:
+                publications = self.publications.take(N=100)
+                if not publications:
+                    break
+                for publication in publications:
+                    self.participants[publication.sample_info.instance_handle] = str(publication.participant_key)
+        return self.participants.get(handle)
+
+    def add(self, topic, samples):
+        if not samples:
+            return
+        self.topics.setdefault(topic, {})
+        counts = self.interval_counts.setdefault(topic, [0, 0])
+        for sample in samples:
+            info = sample.sample_info
+            if not info.valid_data:  # Disposed and unregistered instances carry no seq
+                continue
+            seq = getattr(sample, "seq", None)  # User types may not have one
+            size = sum(payload_size(v) for k, v in sample.__dict__.items() if k != "sample_info")
+            self.writers.add((topic, info.publication_handle))
+            counts[0] += 1
+            counts[1] += size
+            self.pending.setdefault(info.publication_handle, []).append((topic, seq, size))
+        self.resolve()
+
+    # Count the samples per publisher once the participant of their writer is known, so the seq of a
+    # publisher is never split over two trackers. A take holds the samples grouped per type, not in the
+    # order they were written, so they are put back in seq order first. At exit a writer that was never
+    # discovered counts as a participant of its own.
+    def resolve(self, final=False):
+        resolved = []
+        for handle in list(self.pending):
+            participant = self.participant(handle)
+            if participant is None and not final:
+                continue
+            resolved += [(topic, participant or str(handle), seq, size)
+                         for topic, seq, size in self.pending.pop(handle)]
+        resolved.sort(key=lambda s: (s[0], s[1], -1 if s[2] is None else s[2]))
+        for topic, participant, seq, size in resolved:
+            publisher = (participant, seq >> seq_bits if seq is not None else 0)
+            publisher_counts = self.publishers.setdefault((topic, *publisher), [0, 0])
+            publisher_counts[0] += 1
+            publisher_counts[1] += size
+            if seq is None:
+                continue
+            trackers = self.topics[topic]
+            tracker = trackers.get(publisher)
+            if tracker is None:
+                tracker = trackers[publisher] = SeqTracker()
+            tracker.add(seq)
+
+    # Seconds until the next report
+    def timeout(self):
+        return max(self.last_report + self.interval - time.monotonic(), 0)
+
+    def poll(self):
+        if time.monotonic() - self.last_report >= self.interval:
+            self.report()
+
+    # One line per topic to stderr, the loss counters count since the last report:
+    # HH:MM:SS.mmm topic: received N (B bytes) writers W dup D ooo O lost L
+    # At exit one line per publisher with its totals, the worker is only shown for workers after the first:
+    # topic writer PARTICIPANT[/WORKER]: received N (B bytes) dup D ooo O lost L
+    def report(self, final=False):
+        self.last_report = time.monotonic()
+        self.resolve(final)
+        now = datetime.datetime.now().strftime('%H:%M:%S.%f')[:-3]
+        for topic, trackers in self.topics.items():
+            if final:  # Nothing arrives anymore, the missing samples are lost
+                for tracker in trackers.values():
+                    tracker.expire(tracker.highest)
+            received, size = self.interval_counts.get(topic, (0, 0))
+            totals = (sum(tracker.duplicates for tracker in trackers.values()),
+                      sum(tracker.out_of_order for tracker in trackers.values()),
+                      sum(tracker.lost for tracker in trackers.values()))
+            duplicates, out_of_order, lost = (total - previous for total, previous
+                                              in zip(totals, self.reported.get(topic, (0, 0, 0))))
+            self.reported[topic] = totals
+            writers = sum(1 for writer_topic, _ in self.writers if writer_topic == topic)
+            print(f"{now} {topic}: received {received} ({size} bytes) writers {writers} " +
+                  f"dup {duplicates} ooo {out_of_order} lost {lost}", file=sys.stderr)
+        self.interval_counts = {}
+        if final:
+            for (topic, participant, worker), (received, size) in self.publishers.items():
+                tracker = self.topics[topic].get((participant, worker)) or SeqTracker()
+                name = f"{participant}/{worker}" if worker else participant
+                print(f"{topic} writer {name}: received {received} ({size} bytes) dup {tracker.duplicates} " +
+                      f"ooo {tracker.out_of_order} lost {tracker.lost}", file=sys.stderr)
+
+
+# Latency of the timed samples per topic, from the histograms TopicManager records while taking
+class LatencyReport:
+    def __init__(self, interval):
+        self.interval = interval
+        self.last_report = time.monotonic()
+        self.totals = {}  # topic -> histogram of the whole run
+
+    def timeout(self):
+        return max(self.last_report + self.interval - time.monotonic(), 0)
+
+    def poll(self, managers):
+        if time.monotonic() - self.last_report >= self.interval:
+            self.report(managers)
+
+    # One line per topic to stderr with the latency since the last report, and of the whole run at exit:
+    # HH:MM:SS.mmm topic: latency N samples p50 Xus p99 Xus p99.9 Xus max Xus
+    def report(self, managers, final=False):
+        self.last_report = time.monotonic()
+        now = datetime.datetime.now().strftime('%H:%M:%S.%f')[:-3]
+        for manager in managers:
+            total = self.totals.setdefault(manager.topic_name, LatencyHistogram())
+            total.merge(manager.latency)
+            print(f"{now} {manager.topic_name}: {latency_line(manager.latency)}", file=sys.stderr)
+            manager.latency.reset()
+        if final:
+            for topic, total in self.totals.items():
+                print(f"{topic} total: {latency_line(total)}", file=sys.stderr)
+
+
+def latency_line(histogram):
+    latency = {k: v or 0 for k, v in histogram.summary_us().items()}
+    return (f"latency {latency['count']} samples p50 {latency['p50']:.1f}us p99 {latency['p99']:.1f}us " +
+            f"p99.9 {latency['p99.9']:.1f}us max {latency['max']:.1f}us")
@@ -36,3 +36,113 @@ class IntSequence:
 class StrSequence:
     seq: int
     keyval: sequence[str, 100]  # max 100 string elements
+
+
+@cdr
+class Blob:
+    seq: int
+    keyval: bytes  # sequence of octets, written straight from any bytes-like buffer
+
+
+# Keyed variants, every id is a separate instance
+
+
+@cdr(keylist=["id"])
+class KeyedInteger:
+    seq: int
+    keyval: int
+    id: int
+
+
+@cdr(keylist=["id"])
+class KeyedString:
+    seq: int
+    keyval: str
+    id: int
+
+
+@cdr(keylist=["id"])
+class KeyedIntArray:
+    seq: int
+    keyval: array[int, 3]
+    id: int
+
+
+@cdr(keylist=["id"])
+class KeyedStrArray:
+    seq: int
+    keyval: array[str, 5]
+    id: int
+
+
+@cdr(keylist=["id"])
+class KeyedIntSequence:
+    seq: int
+    keyval: sequence[int]
+    id: int
+
+
+@cdr(keylist=["id"])
+class KeyedStrSequence:
+    seq: int
+    keyval: sequence[str, 100]
+    id: int
+
+
+@cdr(keylist=["id"])
+class KeyedBlob:
+    seq: int
+    keyval: bytes
+    id: int
+
+
+# Timed variants, ts is the send time in ns since the epoch for the latency on the receiving side
+
+
+@cdr
+class TimedInteger:
+    seq: int
+    keyval: int
+    ts: int
+
+
+@cdr
+class TimedString:
+    seq: int
+    keyval: str
+    ts: int
+
+
+@cdr
+class TimedIntArray:
+    seq: int
+    keyval: array[int, 3]
+    ts: int
+
+
+@cdr
+class TimedStrArray:
+    seq: int
+    keyval: array[str, 5]
+    ts: int
+
+
+@cdr
+class TimedIntSequence:
+    seq: int
+    keyval: sequence[int]
+    ts: int
+
+
+@cdr
+class TimedStrSequence:
+    seq: int
+    keyval: sequence[str, 100]
+    ts: int
+
+
+@cdr
+class TimedBlob:
+    seq: int
+    keyval: bytes
+    ts: int
@@ -0,0 +1,70 @@
+import math
+
+
+# Log-bucketed latency histogram in the style of HdrHistogram, with a fixed amount of memory.
+# Values below 2**sub_bits are counted exactly, above that every power of two is split into
+# 2**(sub_bits - 1) linear buckets, so a bucket is never wider than 2**(1 - sub_bits) of its value.
+class LatencyHistogram:
+    def __init__(self, sub_bits=7, max_bits=42):
+        self.sub_bits = sub_bits
+        self.sub_count = 1 << sub_bits
+        self.half_count = self.sub_count >> 1
+        self.max_value = (1 << max_bits) - 1  # Larger values are counted in the last bucket
+        self.counts = [0] * self.index(self.max_value) + [0]
+        self.total = 0
+        self.max = 0
+
+    def index(self, value):
+        shift = value.bit_length() - self.sub_bits
+        if shift <= 0:
+            return value
+        return self.sub_count + (shift - 1) * self.half_count + (value >> shift) - self.half_count
+
+    # Highest value counted in a bucket
+    def value_at(self, index):
+        if index < self.sub_count:
+            return index
+        shift, sub = divmod(index - self.sub_count, self.half_count)
+        return ((sub + self.half_count + 1) << (shift + 1)) - 1
+
+    def record(self, value):
+        if value < 0:
+            value = 0
+        if value > self.max:
+            self.max = value
+        self.counts[self.index(min(value, self.max_value))] += 1
+        self.total += 1
+
+    def merge(self, other):
+        for i, count in enumerate(other.counts):
+            if count:
+                self.counts[i] += count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def reset(self):
+        self.counts = [0] * len(self.counts)
+        self.total = 0
+        self.max = 0
+
+    def percentile(self, p):
+        if not self.total:
+            return None
+        target = max(math.ceil(self.total * p / 100), 1)
+        count = 0
+        for i, bucket in enumerate(self.counts):
+            count += bucket
+            if count >= target:
+                return self.max if i == len(self.counts) - 1 else min(self.value_at(i), self.max)
+        return self.max
+
+    # Percentiles in microseconds of a histogram of nanoseconds
+    def summary_us(self):
+        return {
+            "count": self.total,
+            "p50": self.percentile(50) / 1e3 if self.total else None,
+            "p90": self.percentile(90) / 1e3 if self.total else None,
+            "p99": self.percentile(99) / 1e3 if self.total else None,
+            "p99.9": self.percentile(99.9) / 1e3 if self.total else None,
+            "max": self.max / 1e3 if self.total else None
+        }
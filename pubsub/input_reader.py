@@ -0,0 +1,150 @@
+import time
+import mmap
+import queue
+import codecs
+import threading
+
+try:
+    import numpy
+except ImportError:  # Only needed to replay '.npy' files
+    numpy = None
+
+from cyclonedds.core import GuardCondition
+
+
+class InputReader:
+    def __init__(self, dp, waitset, chunks):
+        self.chunks = chunks
+        # Bounded, so a fast input blocks the reader thread instead of growing the memory use
+        self.lines = queue.Queue(maxsize=1024)
+        self.eof = False  # set once the end of the stream has been handed out by poll
+        self.paused = False
+        self.error = None
+        # Triggered by the reader thread, so the waitset wakes up on new input as well as on new samples
+        self.guard = GuardCondition(dp)
+        self.waitset = waitset
+        waitset.attach(self.guard)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    # Block on the input in a dedicated thread and hand the text to the main loop
+    def run(self):
+        try:
+            for chunk in self.chunks:
+                self.lines.put(chunk)
+                self.guard.set(True)
+        except Exception as e:  # Raised in the main loop by poll
+            self.error = e
+        self.lines.put(None)
+        self.guard.set(True)
+
+    # Leave the input in the queue while paused, the guard is detached so the waitset doesn't wake up for it
+    def pause(self, paused):
+        if paused != self.paused:
+            if paused:
+                self.waitset.detach(self.guard)
+            else:
+                self.waitset.attach(self.guard)
+            self.paused = paused
+
+    # Return all text received since the last call
+    def poll(self):
+        lines = []
+        if not self.paused and self.guard.take():
+            while True:
+                try:
+                    line = self.lines.get_nowait()
+                except queue.Empty:
+                    break
+                if line is None:
+                    self.eof = True
+                    if self.error:
+                        raise self.error
+                    break
+                lines.append(line)
+        return lines
+
+
+# Stream a memory-mapped file in chunks of complete lines, the file is never loaded as a whole.
+# A line "@<seconds>" delays the following lines until that many seconds after the start of the replay,
+# divided by the rate. A rate of 0 ignores the delays, loop 0 repeats the file forever.
+def replay_file(filename, loop=1, rate=1.0, chunk_size=65536):
+    try:
+        f = open(filename, "rb")
+    except OSError:
+        raise Exception(f"Could not open file {filename}")
+    with f:
+        if not f.seek(0, 2):  # An empty file can't be mapped
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            decoder = codecs.getincrementaldecoder("utf-8")()
+            time_start = time.monotonic()
+            count = 0
+            while not loop or count < loop:
+                count += 1
+                mm.seek(0)
+                chunk = []
+                size = 0
+                offset = 0
+                line = b"\n"
+                for line in iter(mm.readline, b""):
+                    if line.startswith(b"@"):
+                        if chunk:
+                            yield decoder.decode(b"".join(chunk))
+                            chunk, size = [], 0
+                        try:
+                            offset = float(line[1:])
+                        except ValueError:
+                            raise Exception(f"Invalid replay time {line.decode().strip()} in {filename}")
+                        if rate:
+                            delay = time_start + offset / rate - time.monotonic()
+                            if delay > 0:
+                                time.sleep(delay)
+                        continue
+                    chunk.append(line)
+                    size += len(line)
+                    if size >= chunk_size:
+                        yield decoder.decode(b"".join(chunk))
+                        chunk, size = [], 0
+                if not line.endswith(b"\n"):  # Don't join the last word with the first word of the next loop
+                    chunk.append(b"\n")
+                if chunk:
+                    yield decoder.decode(b"".join(chunk))
+                # The next loop starts where the timing of this one ended
+                if rate:
+                    time_start += offset / rate
+            yield decoder.decode(b"", final=True)
+
+
+# Stream a memory-mapped file as memoryviews of size bytes, the payload is never copied.
+# The map is left open for the views still in use and closed when the last one is released.
+def replay_blobs(filename, size, loop=1):
+    try:
+        f = open(filename, "rb")
+    except OSError:
+        raise Exception(f"Could not open file {filename}")
+    with f:
+        length = f.seek(0, 2)
+        if not length:
+            return
+        buffer = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    count = 0
+    while not loop or count < loop:
+        count += 1
+        for offset in range(0, length, size):
+            yield buffer[offset:offset + size]
+
+
+# Stream the rows of a memory-mapped '.npy' file, a one-dimensional array is a single row.
+# Every row is handed to the writer as a NumPy array and converted in one call.
+def replay_npy(filename, loop=1):
+    try:
+        data = numpy.load(filename, mmap_mode="r")
+    except (OSError, ValueError):
+        raise Exception(f"Could not open file {filename}")
+    rows = [data] if data.ndim == 1 else data
+    count = 0
+    while not loop or count < loop:
+        count += 1
+        for row in rows:
+            yield row
@@ -0,0 +1,148 @@
+import io
+import base64
+import sys
+import csv
+import json
+import time
+import datetime
+
+from cyclonedds.core import InstanceState
+
+
+instance_states = {
+    InstanceState.Alive: "alive",
+    InstanceState.NotAliveDisposed: "disposed",
+    InstanceState.NotAliveNoWriters: "no_writers"
+}
+
+
+# Sample fields without the sample info added by the reader, blobs in base64 and NumPy arrays as lists
+def sample_fields(sample):
+    return {k: base64.b64encode(v).decode() if type(v) is bytes else v.tolist() if hasattr(v, "tolist") else v
+            for k, v in sample.__dict__.items() if k != "sample_info"}
+
+
+# Sample representation with the size of blobs instead of their content
+def sample_text(sample):
+    if type(getattr(sample, "keyval", None)) is not bytes:
+        return str(sample)
+    fields = ", ".join(f"{k}=<{len(v)} bytes>" if type(v) is bytes else f"{k}={v!r}"
+                       for k, v in sample.__dict__.items() if k != "sample_info")
+    return f"{type(sample).__name__}({fields})"
+
+
+def instance_state(sample):
+    return instance_states.get(sample.sample_info.instance_state, "unknown")
+
+
+class SampleOutput:
+    block_size = 65536  # Flush once this many characters are buffered
+
+    def __init__(self, args):
+        self.format = args.format
+        self.summary = args.summary
+        self.keyed = bool(args.instances)  # Add the instance state of every sample
+        self.flush_interval = args.flush_interval
+        if args.output:
+            try:
+                self.file = open(args.output, "w")
+            except OSError:
+                raise Exception(f"Could not open file {args.output}")
+        else:
+            self.file = sys.stdout
+        self.pending = []
+        self.pending_size = 0
+        self.counts = {}
+        self.last_flush = time.monotonic()
+        self.last_summary = self.last_flush
+
+        if self.format == "csv":
+            self.csv_buffer = io.StringIO()
+            self.csv_writer = csv.writer(self.csv_buffer, lineterminator="\n")
+            self.format_sample = self.format_csv
+        elif self.format == "ndjson":
+            self.format_sample = self.format_ndjson
+        else:
+            self.format_sample = self.format_text
+
+    # The topic name is only given when subscribing to multiple topics
+    def format_text(self, sample, topic):
+        text = f"Subscriberd: {topic}: {sample_text(sample)}" if topic else f"Subscriberd: {sample_text(sample)}"
+        if self.keyed:
+            return f"{text} [{instance_state(sample)}]\n"
+        return text + "\n"
+
+    def format_ndjson(self, sample, topic):
+        data = {"topic": topic} if topic else {}
+        data["type"] = type(sample).__name__
+        if self.keyed:
+            data["instance_state"] = instance_state(sample)
+        data.update(sample_fields(sample))
+        return json.dumps(data) + "\n"
+
+    # One row per sample: the topic name, the type name, the instance state and the fields, lists are written in JSON
+    def format_csv(self, sample, topic):
+        row = [topic] if topic else []
+        row.append(type(sample).__name__)
+        if self.keyed:
+            row.append(instance_state(sample))
+        row += [json.dumps(v) if isinstance(v, list) else v for v in sample_fields(sample).values()]
+        self.csv_writer.writerow(row)
+        row = self.csv_buffer.getvalue()
+        self.csv_buffer.seek(0)
+        self.csv_buffer.truncate()
+        return row
+
+    def write(self, samples, topic=None):
+        if self.summary:
+            counts = self.counts
+            for sample in samples:
+                name = f"{topic}/{type(sample).__name__}" if topic else type(sample).__name__
+                counts[name] = counts.get(name, 0) + 1
+        elif samples:
+            format_sample = self.format_sample
+            text = "".join([format_sample(sample, topic) for sample in samples])
+            self.pending.append(text)
+            self.pending_size += len(text)
+            if self.pending_size >= self.block_size:
+                self.flush()
+
+    # Flush or summarize when the interval passed, call regularly from the main loop
+    def poll(self):
+        now = time.monotonic()
+        if self.summary:
+            if now - self.last_summary >= self.summary:
+                self.write_summary()
+                self.last_summary = now
+        elif self.pending and now - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    # Seconds until poll has work to do
+    def timeout(self):
+        if self.summary:
+            return max(self.last_summary + self.summary - time.monotonic(), 0)
+        elif self.pending:
+            return max(self.last_flush + self.flush_interval - time.monotonic(), 0)
+        return None
+
+    def write_summary(self):
+        total = sum(self.counts.values())
+        counts = "".join(f" {name}={count}" for name, count in self.counts.items())
+        self.pending.append(f"{datetime.datetime.now().strftime('%H:%M:%S.%f')[:-3]} received {total}{counts}\n")
+        self.counts = {}
+        self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.file.write("".join(self.pending))
+            self.pending = []
+            self.pending_size = 0
+        self.file.flush()
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        if self.summary:
+            self.write_summary()
+        self.flush()
+        if self.file is not sys.stdout:
+            self.file.close()
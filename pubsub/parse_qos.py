@@ -2,6 +2,7 @@ from cyclonedds.qos import BasePolicy, Qos, Policy
 from cyclonedds.util import duration
 
 from dataclasses import fields
+from functools import lru_cache
 from typing import Sequence, List, Union
 
 
@@ -30,8 +31,13 @@ class QosParser:
     @staticmethod
     def parse(arguments: List[str]) -> Qos:
         # Main method: qos = QosParser.parse(arguments)
-        arguments = QosParser.prepare_arguments(arguments)
-        parser = QosParser(arguments)
+        return QosParser.parse_prepared(tuple(QosParser.prepare_arguments(arguments)))
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def parse_prepared(arguments) -> Qos:
+        # Every distinct spec is parsed once, the Qos is shared by all callers and never modified
+        parser = QosParser(list(arguments))
         return Qos(*parser.parse_list_of_policies())
 
     def parse_list_of_policies(self) -> List[BasePolicy]:
@@ -51,39 +57,51 @@ class QosParser:
             raise Exception(f"No such policy {name}")
 
         policy = self.policies[name]
-        argument_types = [f.type for f in fields(policy)]
+        plan = self.plans[name]
 
-        if argument_types:
+        if plan:
             # There is a non-zero amount of typed arguments to parse
-            arguments = [self.parse_argument_of_type(_type) for _type in argument_types]
+            arguments = [parse_argument(self) for parse_argument in plan]
             return policy(*arguments)
         else:
             # There are no arguments to parse so the policy is already complete
             return policy
 
-    def parse_argument_of_type(self, _type):
-        # Typed dispatch to simple parsers
+    @classmethod
+    def argument_parser(cls, _type):
+        # Typed dispatch to simple parsers, resolved once per policy argument by compile_plans
 
         if _type == str:
-            return self.string()
+            return cls.string
         elif _type == int:
-            return self.integer()
+            return cls.integer
         elif _type == float:
-            return self.floating()
+            return cls.floating
         elif _type == bool:
-            return self.boolean()
+            return cls.boolean
         elif _type == Sequence[str]:
-            return self.string_list()
+            return cls.string_list
         elif _type == bytes:
-            return self.binary_data()
+            return cls.binary_data
         elif _type == Union['Policy.History.KeepAll', 'Policy.History.KeepLast']:
             # This is a special case for DurabilityService which contains a History Policy
-            ret = self.parse_policy()
-            if ret.__scope__ != "History":
-                raise Exception("DurabilityService takes a History policy")
-            return ret
-
-        raise Exception(f"Cannot parse type {_type}, this is a bug, please report it.")
+            return cls.history_policy
+
+        def unknown(self):
+            raise Exception(f"Cannot parse type {_type}, this is a bug, please report it.")
+        return unknown
+
+    @classmethod
+    def compile_plans(cls):
+        # Policy name -> parser of every argument, so parsing a policy doesn't inspect its fields
+        return {name: tuple(cls.argument_parser(f.type) for f in fields(policy))
+                for name, policy in cls.policies.items()}
+
+    def history_policy(self):
+        ret = self.parse_policy()
+        if ret.__scope__ != "History":
+            raise Exception("DurabilityService takes a History policy")
+        return ret
 
     def pop(self) -> str:
         # Safely return the next item in the parse list and increment the position
@@ -159,3 +177,6 @@ class QosParser:
         # Support Userdata, Groupdata or Topicdata as base64 encoded string.
         data = self.string()
         return data.encode()
+
+
+QosParser.plans = QosParser.compile_plans()
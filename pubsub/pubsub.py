@@ -1,47 +1,168 @@
 #!/usr/bin/env python3
 import sys
-import select
 import datetime
+import itertools
+import concurrent.futures
 
 from util import create_parser
+from input_reader import InputReader, replay_file, replay_blobs, replay_npy
+from tokenizer import Tokenizer
 from check_entity_qos import entity_qos
+from check_qos_compat import check_qos
 from parse_qos import QosParser
+from qos_profile import load_profile
 from pubsub_topic import TopicManager
+from bench import run_bench
+from workers import run_workers
+from output import SampleOutput
+from rate import RateLimiter
+from counters import ReceiveCounters, LatencyReport
 from cyclonedds.core import WaitSet
 from cyclonedds.domain import DomainParticipant
 from cyclonedds.util import duration
 from cyclonedds.qos import Qos, Policy
 
 
+class WriteStats:
+    def __init__(self):
+        self.samples = 0
+        self.elapsed = datetime.timedelta()
+
+    def add(self, samples, elapsed):
+        self.samples += samples
+        self.elapsed += elapsed
+
+    # Print the write rate to stderr so the subscribed samples on stdout are not affected
+    def report(self):
+        seconds = self.elapsed.total_seconds()
+        rate = self.samples / seconds if seconds else 0
+        print(f"Published {self.samples} samples in {seconds:.3f}s ({rate:.0f} samples/s)", file=sys.stderr)
+
+
+# Write the input values to a topic and take its received samples, returns the time spent writing as well
+def service(manager, values, batch):
+    time_start = datetime.datetime.now()
+    if batch:
+        for i in range(0, len(values), batch):
+            manager.write_batch(values[i:i + batch])
+    else:
+        for value in values:
+            manager.write(value)
+    elapsed = datetime.datetime.now() - time_start
+    return elapsed, manager.take()
+
+
 def main(sys_args):
     eqos = [None] * 5
+    qos = None
     args = create_parser(sys_args)
-    if args.qos:
+    if args.qos_profile:
+        qos, eqos = load_profile(args.qos_file, args.qos_profile)
+    elif args.qos:
         qos = QosParser.parse(args.qos)
         eqos = entity_qos(qos, args.entityqos)
+    # Incompatible QoS are reported before any entity exists, instead of after discovery
+    remotes = [(f"profile {name}", load_profile(args.qos_file, name)[1]) for name in args.check_qos or []]
+    check_qos(eqos, remotes, strict=args.check_qos is not None)
+    # The workers create their own participant after the fork
+    if args.workers:
+        return run_workers(args, qos, eqos)
     q = Qos(Policy.IgnoreLocal.Process)
-    dp = DomainParticipant(0, qos=q)
+    dp = DomainParticipant(args.domain, qos=q)
     waitset = WaitSet(dp)
-    manager = TopicManager(args, dp, eqos, waitset)
+    # One TopicManager per topic, all sharing the participant and waitset
+    managers = [TopicManager(args, dp, eqos, waitset, topic) for topic in args.topic]
+    if args.bench:
+        return run_bench(args, managers, qos)
     if args.topic:
+        stats = WriteStats()
+        output = SampleOutput(args)
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=args.threads) if args.threads > 1 else None
+        limiter = RateLimiter(args.rate, args.burst) if args.rate else None
+        counters = ReceiveCounters(args.stats, dp) if args.stats else None
+        latency = LatencyReport(args.latency) if args.latency else None
         try:
+            # Blobs and NumPy rows are written as they are, without parsing
+            raw = bool(args.blob_size or (args.input_file or "").endswith(".npy"))
+            registry = args.registry
+            if args.blob_size:
+                chunks = replay_blobs(args.input_file, args.blob_size, args.loop)
+            elif raw:
+                chunks = replay_npy(args.input_file, args.loop)
+            elif args.input_file:
+                chunks = replay_file(args.input_file, args.loop, args.replay_rate)
+            else:
+                chunks = iter(sys.stdin.readline, "")
+            input_reader = InputReader(dp, waitset, chunks)
+            tokenizer = Tokenizer()
             time_start = datetime.datetime.now()
+            time_end = time_start + datetime.timedelta(seconds=args.runtime) if args.runtime else None
             v = True
             while v:
-                input = select.select([sys.stdin], [], [], 0)[0]
-                if input:
-                    for text in sys.stdin.readline().split():
-                        try:  # integer or list
-                            text = eval(text)
-                            manager.write(text)
-                        except NameError:  # string
-                            manager.write(text.rstrip("\n"))
-                manager.read()
-                waitset.wait(duration(microseconds=20))
+                # Sleep until stdin or one of the readers triggers, wake up every second to handle interrupts
+                timeout = 1
+                if time_end:
+                    timeout = min(timeout, max((time_end - datetime.datetime.now()).total_seconds(), 0))
+                if output.timeout() is not None:
+                    timeout = min(timeout, output.timeout())
+                if limiter and limiter.pending:
+                    timeout = min(timeout, limiter.timeout())
+                if counters:
+                    timeout = min(timeout, counters.timeout())
+                if latency:
+                    timeout = min(timeout, latency.timeout())
+                waitset.wait(duration(seconds=timeout))
+                if raw:
+                    values = input_reader.poll()
+                elif registry:  # One JSON object per line, the chunks hold complete lines
+                    values = [registry.parse_line(line) for chunk in input_reader.poll()
+                              for line in chunk.splitlines() if line.strip()]
+                else:
+                    values = [value for line in input_reader.poll() for value in tokenizer.feed(line)]
+                    if input_reader.eof:
+                        values += tokenizer.finish()
+                if limiter:
+                    values = limiter.pace(values)
+                    # Further input waits in the bounded queue of the reader until the backlog is written
+                    input_reader.pause(len(limiter.pending) >= limiter.burst)
+                # Every topic gets all input values, only the writes count for the write rate
+                if pool:
+                    received = list(pool.map(service, managers, itertools.repeat(values), itertools.repeat(args.batch)))
+                else:
+                    received = [service(manager, values, args.batch) for manager in managers]
+                for manager, (elapsed, samples) in zip(managers, received):
+                    if values and args.batch:
+                        stats.add(len(values), elapsed)
+                    output.write(samples, manager.topic_name if len(managers) > 1 else None)
+                    if counters:
+                        counters.add(manager.topic_name, samples)
+                output.poll()
+                if counters:
+                    counters.poll()
+                if latency:
+                    latency.poll(managers)
                 if args.runtime:
-                    v = datetime.datetime.now() < time_start + datetime.timedelta(seconds=args.runtime)
-        except KeyboardInterrupt:
-            sys.exit(0)
+                    v = datetime.datetime.now() < time_end
+        except KeyboardInterrupt:  # An interrupt ends the run like the end of the runtime, with the reports
+            pass
+        finally:
+            if args.instance_exit == "dispose":
+                for manager in managers:
+                    manager.dispose_instances()
+            elif args.instance_exit == "unregister":
+                for manager in managers:
+                    manager.unregister_instances()
+            output.close()
+            if pool:
+                pool.shutdown()
+        if args.batch:
+            stats.report()
+        if limiter:
+            limiter.report()
+        if counters:
+            counters.report(final=True)
+        if latency:
+            latency.report(managers, final=True)
 
 
 if __name__ == '__main__':
@@ -1,4 +1,19 @@
-from datastruct import Integer, String, IntArray, StrArray, IntSequence, StrSequence
+import mmap
+import time
+import typing
+import dataclasses
+
+try:
+    import numpy
+except ImportError:  # NumPy is optional, only needed to write NumPy arrays and for --numpy
+    numpy = None
+
+from datastruct import Integer, String, IntArray, StrArray, IntSequence, StrSequence, Blob
+from datastruct import (KeyedInteger, KeyedString, KeyedIntArray, KeyedStrArray,
+                        KeyedIntSequence, KeyedStrSequence, KeyedBlob)
+from datastruct import (TimedInteger, TimedString, TimedIntArray, TimedStrArray,
+                        TimedIntSequence, TimedStrSequence, TimedBlob)
+from histogram import LatencyHistogram
 from cyclonedds.pub import Publisher, DataWriter
 from cyclonedds.sub import Subscriber, DataReader
 from cyclonedds.topic import Topic
@@ -11,69 +26,283 @@ class QosListener(Listener):
               "PubSub may not be available.")
 
 
+# Dispatch key of a datastruct: the keyval type for scalars,
+# (element type, length) for arrays and (element type, None) for sequences
+def keyval_kind(datastruct):
+    keyval = datastruct.__annotations__['keyval']
+    metadata = getattr(keyval, "__metadata__", None)
+    if not metadata:
+        return keyval
+    element = typing.get_args(typing.get_args(keyval)[0])[0]
+    return element, getattr(metadata[0], "length", None)
+
+
+# Smallest valid keyval of a dispatch key, for the reused samples and registering instances
+def empty_keyval(kind):
+    if type(kind) is not tuple:
+        return kind()
+    element, length = kind
+    return [element()] * (length or 0)
+
+
+# Topic name suffix -> datastruct of every type published by pubsub
+topic_types = {
+    "int": Integer,
+    "str": String,
+    "int_array": IntArray,
+    "str_array": StrArray,
+    "int_seq": IntSequence,
+    "str_seq": StrSequence,
+    "blob": Blob
+}
+
+# Types used with --instances, published on "keyed_" topics
+keyed_topic_types = {
+    "int": KeyedInteger,
+    "str": KeyedString,
+    "int_array": KeyedIntArray,
+    "str_array": KeyedStrArray,
+    "int_seq": KeyedIntSequence,
+    "str_seq": KeyedStrSequence,
+    "blob": KeyedBlob
+}
+
+
+# Types used with --latency, published on "timed_" topics
+timed_topic_types = {
+    "int": TimedInteger,
+    "str": TimedString,
+    "int_array": TimedIntArray,
+    "str_array": TimedStrArray,
+    "int_seq": TimedIntSequence,
+    "str_seq": TimedStrSequence,
+    "blob": TimedBlob
+}
+
+# NumPy dtype kind -> element type of the arrays and sequences
+numpy_elements = {
+    "i": int,
+    "u": int,
+    "U": str
+}
+
+
 class TopicManager():
-    def __init__(self, args, dp, qos, waitset):
+    def __init__(self, args, dp, qos, waitset, topic_name):
         self.dp = dp
-        self.topic_name = args.topic
+        self.waitset = waitset
+        self.topic_name = topic_name
         self.seq = -1
+        # With --instances the writes are spread round-robin over that many keys
+        self.instances = args.instances
+        self.key = -1
+        # With --latency every sample carries its send time, the latency of the taken samples is recorded
+        self.timed = bool(args.latency)
+        self.latency = LatencyHistogram()
+        # With --type-module the user types replace the built-in ones, samples are written as they are
+        self.registry = args.registry
+        if self.registry:
+            self.types, self.prefix = self.registry.datastructs(), ""
+        elif self.instances:
+            self.types, self.prefix = keyed_topic_types, "keyed_"
+        elif self.timed:
+            self.types, self.prefix = timed_topic_types, "timed_"
+        else:
+            self.types, self.prefix = topic_types, ""
+        # Read conditions of the integer arrays and sequences, taken as NumPy arrays with --numpy
+        self.numpy = args.numpy and not self.registry
+        self.numpy_conds = set()
+        self.handles = {}  # type name -> instance handle of every key, registered when the writer is created
+        self.samples = {}  # type name -> sample reused for every write
         self.tqos, self.pqos, self.sqos, self.wqos, self.rqos = qos
-        self.reader = []
+        self.writers = {}
+        self.readers = {}
+        self.read_conds = {}  # read condition -> reader, every reader wakes up the waitset
         try:
             self.listener = QosListener()
             self.pub = Publisher(dp, qos=self.pqos)
             self.sub = Subscriber(dp, qos=self.sqos)
-            self.int_writer = self.create_entities("int", Integer)
-            self.str_writer = self.create_entities("str", String)
-            self.int_array_writer = self.create_entities("int_array", IntArray)
-            self.str_array_writer = self.create_entities("str_array", StrArray)
-            self.int_seq_writer = self.create_entities("int_seq", IntSequence)
-            self.str_seq_writer = self.create_entities("str_seq", StrSequence)
         except DDSException:
             raise Exception("The arguments inputted are considered invalid for cyclonedds.")
 
-        self.read_cond = ReadCondition(self.reader[0], ViewState.Any | InstanceState.Alive | SampleState.NotRead)
-        waitset.attach(self.read_cond)
+        # Map the keyval type of every datastruct to its type name, so writing a value is a single lookup
+        if not self.registry:
+            self.dispatch = {keyval_kind(datastruct): name for name, datastruct in self.types.items()}
+            # Blobs are written from any buffer without copying it to bytes first
+            for buffer in (bytearray, memoryview, mmap.mmap):
+                self.dispatch[buffer] = self.dispatch[bytes]
+
+        # Without --types or --lazy all entities are created upfront
+        if args.lazy:
+            types = []
+        elif args.types:
+            types = args.types
+        else:
+            types = self.types
+        for name in types:
+            self.create_entities(name)
 
     def write(self, input):
+        if self.registry:
+            self.write_sample(input)
+            return
+        name = self.input_type(input)
+        if type(input) is not list and numpy and isinstance(input, numpy.ndarray):
+            input = input.tolist()  # Converted in a single call instead of element by element
+        self.write_value(name, input)
+
+    # Write many values at once, samples of the same type are written back-to-back per writer
+    def write_batch(self, values):
+        if self.registry:
+            for value in values:
+                self.write_sample(value)
+            return len(values)
+        batch = {}
+        for value in values:
+            name = self.input_type(value)
+            if type(value) is not list and numpy and isinstance(value, numpy.ndarray):
+                value = value.tolist()
+            self.seq += 1
+            if self.instances:
+                self.key = (self.key + 1) % self.instances
+            batch.setdefault(name, []).append((self.seq, self.key, value))
+        self.flush(batch)
+        return len(values)
+
+    def flush(self, batch):
+        for name, values in batch.items():
+            write = self.writer(name).write
+            sample = self.samples[name]
+            for seq, key, value in values:
+                sample.seq = seq
+                sample.keyval = value
+                if self.instances:
+                    sample.id = key
+                elif self.timed:
+                    sample.ts = time.time_ns()
+                write(sample)
+
+    # Write a keyval as the given type without type dispatch, returns the seq of the sample.
+    # Every writer has one sample that is filled in for each write, the writer serializes it right away.
+    def write_value(self, name, keyval):
+        writer = self.writers.get(name) or self.create_entities(name)
+        sample = self.samples[name]
         self.seq += 1
-        # Write integer
-        if type(input) is int:
-            self.int_writer.write(Integer(self.seq, input))
-        elif type(input) is list:
-            for i in input:
-                if not isinstance(i, type(input[0])):  # Check if elements in the list are the same type
-                    raise Exception("TypeError: Element type inconsistent, " +
-                                    "input list should be a list of integer or a list of string.")
-
-            # Write array or sequence of integer
-            if isinstance(input[0], int):
-                int_arr_len = IntArray.__annotations__['keyval'].__metadata__[0].length
-                if len(input) == int_arr_len:
-                    self.int_array_writer.write(IntArray(self.seq, input))
-                else:
-                    self.int_seq_writer.write(IntSequence(self.seq, input))
-            # Write array or sequence of string
-            else:
-                str_arr_len = StrArray.__annotations__['keyval'].__metadata__[0].length
-                if len(input) == str_arr_len:
-                    self.str_array_writer.write(StrArray(self.seq, input))
-                else:
-                    self.str_seq_writer.write(StrSequence(self.seq, input))
-        # Write string
-        else:
-            self.str_writer.write(String(self.seq, input))
-
-    def read(self):
-        for reader in self.reader:
-            for sample in reader.take(N=100):
-                print(f"Subscriberd: {sample}")
-
-    def create_entities(self, name, datastruct):
-        topic = Topic(self.dp, self.topic_name + name, datastruct, qos=self.tqos)
-        writer = DataWriter(self.pub, topic, qos=self.wqos)
-        # Create a list of readers
-        if name == "int":
-            self.reader.append(DataReader(self.sub, topic, qos=self.rqos, listener=self.listener))
+        sample.seq = self.seq
+        sample.keyval = keyval
+        if self.instances:
+            self.key = (self.key + 1) % self.instances
+            sample.id = self.key
+        elif self.timed:
+            sample.ts = time.time_ns()
+        writer.write(sample)
+        return self.seq
+
+    # Write a sample of a user type, its seq is filled in when it has one.
+    # The sample may be written to other topics as well, so it is copied rather than changed.
+    def write_sample(self, sample):
+        name = type(sample).__name__
+        user_type = self.registry.types.get(name)
+        if user_type is None or type(sample) is not user_type.datastruct:
+            raise Exception(f"TypeError: Unsupported input {sample!r}, " +
+                            f"input should be a sample of {', '.join(self.registry.types)}.")
+        writer = self.writers.get(name) or self.create_entities(name)
+        self.seq += 1
+        if user_type.has_seq:
+            sample = dataclasses.replace(sample, seq=self.seq)
+        writer.write(sample)
+        return self.seq
+
+    # Select the type name of the input
+    def input_type(self, input):
+        if type(input) is list:
+            if not input:
+                raise Exception("TypeError: Empty list, input list should contain at least one element.")
+            element = type(input[0])
+            if any(type(i) is not element for i in input):  # Check if elements in the list are the same type
+                raise Exception("TypeError: Element type inconsistent, " +
+                                "input list should be a list of integer or a list of string.")
+            # Array if the length matches, otherwise sequence
+            name = self.dispatch.get((element, len(input))) or self.dispatch.get((element, None))
+        elif numpy and isinstance(input, numpy.ndarray):  # Also the memmap rows of a '.npy' file
+            name = self.ndarray_type(input)
         else:
-            self.reader.append(DataReader(self.sub, topic, qos=self.rqos))
+            name = self.dispatch.get(type(input))
+        if name is None:
+            raise Exception(f"TypeError: Unsupported input {input!r}, " +
+                            "input should be an integer, a string, a list or NumPy array of integer or string " +
+                            "or a buffer.")
+        return name
+
+    # Select the type name of a NumPy array from its dtype, the elements are not inspected
+    def ndarray_type(self, input):
+        if input.ndim != 1:
+            raise Exception(f"TypeError: NumPy array of dimension {input.ndim}, input array should be one-dimensional.")
+        if not input.size:
+            raise Exception("TypeError: Empty array, input array should contain at least one element.")
+        element = numpy_elements.get(input.dtype.kind)
+        return self.dispatch.get((element, len(input))) or self.dispatch.get((element, None))
+
+    # Take from the readers whose read condition triggered
+    def take(self):
+        samples = []
+        for read_cond, reader in self.read_conds.items():
+            if read_cond.is_triggered():
+                taken = reader.take(N=100, condition=read_cond)
+                if self.timed:
+                    now = time.time_ns()
+                    for sample in taken:
+                        self.latency.record(now - sample.ts)
+                if read_cond in self.numpy_conds:
+                    for sample in taken:
+                        if sample.sample_info.valid_data:
+                            sample.keyval = numpy.asarray(sample.keyval, dtype=numpy.int64)
+                samples += taken
+        return samples
+
+    # Dispose or unregister all instances through their cached handles
+    def dispose_instances(self):
+        for name, handles in self.handles.items():
+            for handle in handles:
+                self.writers[name].dispose_instance_handle(handle)
+
+    def unregister_instances(self):
+        for name, handles in self.handles.items():
+            for handle in handles:
+                self.writers[name].unregister_instance_handle(handle)
+
+    def writer(self, name):
+        return self.writers.get(name) or self.create_entities(name)
+
+    # Create the topic, writer and reader of a type, the first time the type is written or subscribed to
+    def create_entities(self, name):
+        datastruct = self.types[name]
+        try:
+            topic = Topic(self.dp, self.topic_name + self.prefix + name, datastruct, qos=self.tqos)
+            writer = DataWriter(self.pub, topic, qos=self.wqos)
+            if name == "int":
+                reader = DataReader(self.sub, topic, qos=self.rqos, listener=self.listener)
+            else:
+                reader = DataReader(self.sub, topic, qos=self.rqos)
+            # Keyed readers also take the disposed and unregistered instance notifications
+            instance_state = InstanceState.Any if self.instances else InstanceState.Alive
+            read_cond = ReadCondition(reader, ViewState.Any | instance_state | SampleState.NotRead)
+            self.waitset.attach(read_cond)
+            kind = keyval_kind(datastruct) if self.numpy else None
+            if type(kind) is tuple and kind[0] is int:
+                self.numpy_conds.add(read_cond)
+            if self.instances:
+                keyval = empty_keyval(keyval_kind(datastruct))
+                self.handles[name] = [writer.register_instance(datastruct(0, keyval, key))
+                                      for key in range(self.instances)]
+                self.samples[name] = datastruct(0, keyval, 0)
+            elif self.timed:  # The ts is filled in for every write
+                self.samples[name] = datastruct(0, empty_keyval(keyval_kind(datastruct)), 0)
+            elif not self.registry:  # The samples of user types are built from the input
+                self.samples[name] = datastruct(0, empty_keyval(keyval_kind(datastruct)))
+        except DDSException:
+            raise Exception("The arguments inputted are considered invalid for cyclonedds.")
+        self.writers[name] = writer
+        self.readers[name] = reader
+        self.read_conds[read_cond] = reader
         return writer
@@ -0,0 +1,145 @@
+import io
+import os
+import sys
+import json
+import pickle
+import hashlib
+import contextlib
+
+import cyclonedds
+import entity_qos as entity_qos_module
+import check_entity_qos
+import parse_qos
+from check_entity_qos import entity_qos
+from parse_qos import QosParser
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11, only JSON profiles
+    tomllib = None
+
+
+cache_version = 2  # Changes whenever the cache layout changes
+
+
+# Digest of the code that compiles the profiles, a cache written by another version is compiled again
+def code_digest():
+    digest = hashlib.sha256(getattr(cyclonedds, "__version__", "").encode())
+    for module in (parse_qos, check_entity_qos, entity_qos_module, sys.modules[__name__]):
+        with open(module.__file__, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+# Named QoS profiles, every profile has the arguments of --qos and optionally --entityqos:
+#
+#     {"reliable": {"qos": ["Reliability.Reliable 10", "History.KeepLast 10"], "entityqos": "datawriter"}}
+#
+# The same in TOML:
+#
+#     [reliable]
+#     qos = ["Reliability.Reliable 10", "History.KeepLast 10"]
+#     entityqos = "datawriter"
+#
+# The parsed Qos, the Qos of every entity and the warnings of every profile are kept in a cache file,
+# which is valid for the same code as long as the profile file has the same mtime and size, or the same content.
+def load_profile(filename, name):
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        raise SystemExit(f"Error: Could not open file {filename}")
+    cache_file = cache_path(filename)
+    code = code_digest()
+    cache = read_cache(cache_file, filename, code)
+    changed = False
+    if cache.get("stat") != (stat.st_mtime_ns, stat.st_size):
+        # Touched or rewritten: compare the content before throwing the compiled profiles away
+        with open(filename, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        if cache.get("hash") != digest:
+            cache = empty_cache(filename, code, digest)
+        cache["stat"] = (stat.st_mtime_ns, stat.st_size)
+        changed = True
+    if name not in cache["profiles"]:
+        cache["profiles"][name] = compile_profile(read_profiles(filename), name, filename)
+        changed = True
+    if changed:
+        write_cache(cache_file, cache)
+    qos, eqos, warnings = cache["profiles"][name]
+    print(warnings, end="")  # The same "not applicable" warnings as when it was compiled
+    return qos, eqos
+
+
+# Parse a profile into its Qos, the Qos of the topic, publisher, subscriber, writer and reader, and the
+# warnings printed while splitting it
+def compile_profile(profiles, name, filename):
+    profile = profiles.get(name)
+    if type(profile) is not dict or not profile.get("qos"):
+        raise SystemExit(f"Error: No QoS profile {name} with a \"qos\" list in {filename}")
+    # The profiles don't pass the choices of --entityqos
+    entity = profile.get("entityqos")
+    if entity not in (None, "all", *check_entity_qos.entities):
+        raise SystemExit(f"Error: Invalid entityqos {entity} of QoS profile {name} in {filename}")
+    arguments = profile["qos"]
+    qos = QosParser.parse([arguments] if type(arguments) is str else arguments)
+    warnings = io.StringIO()
+    with contextlib.redirect_stdout(warnings):
+        eqos = entity_qos(qos, entity)
+    return qos, eqos, warnings.getvalue()
+
+
+def read_profiles(filename):
+    try:
+        if filename.endswith(".toml"):
+            if tomllib is None:
+                raise SystemExit("Error: TOML QoS profiles need Python 3.11 or newer, use JSON instead")
+            with open(filename, "rb") as f:
+                return tomllib.load(f)
+        with open(filename) as f:
+            return json.load(f)
+    except OSError:
+        raise SystemExit(f"Error: Could not open file {filename}")
+    except ValueError as e:
+        raise SystemExit(f"Error: Invalid QoS profile file {filename}: {e}")
+
+
+# One cache file per profile file, in $XDG_CACHE_HOME/pubsub or ~/.cache/pubsub
+def cache_path(filename):
+    directory = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    key = hashlib.sha256(os.path.abspath(filename).encode()).hexdigest()[:16]
+    return os.path.join(directory, "pubsub", f"qos-{key}.pickle")
+
+
+def empty_cache(filename, code, digest=None):
+    return {"version": cache_version, "source": os.path.abspath(filename), "code": code, "hash": digest,
+            "profiles": {}}
+
+
+# A missing or outdated cache is compiled again, an unreadable or corrupt one as well after a warning
+def read_cache(cache_file, filename, code):
+    try:
+        with open(cache_file, "rb") as f:
+            cache = pickle.load(f)
+        if (type(cache) is dict and cache.get("version") == cache_version and
+                cache.get("source") == os.path.abspath(filename) and cache.get("code") == code):
+            return cache
+    except FileNotFoundError:
+        pass
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError, AttributeError, ImportError) as e:
+        print(f"WARNING: Ignoring the QoS profile cache {cache_file}: {e}", file=sys.stderr)
+    return empty_cache(filename, code)
+
+
+# Written to a temporary file first, so concurrent launches never read a partial cache.
+# Without a writable cache the profiles are compiled on every launch.
+def write_cache(cache_file, cache):
+    temp = f"{cache_file}.{os.getpid()}"
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        with open(temp, "wb") as f:
+            pickle.dump(cache, f)
+        os.replace(temp, cache_file)
+    except (OSError, pickle.PicklingError) as e:
+        print(f"WARNING: Could not write the QoS profile cache {cache_file}: {e}", file=sys.stderr)
+        with contextlib.suppress(OSError):
+            os.remove(temp)
@@ -0,0 +1,86 @@
+import sys
+import time
+import collections
+
+
+# Token bucket on a fixed schedule: message i is due at start + (i + 1 - burst) / rate, so up to burst
+# messages are written at once and the average never exceeds the rate. A writer that falls behind writes
+# the missed messages right away instead of skipping them, so a slow system shows up as lag rather than
+# as a silently lower load (coordinated omission).
+class RateLimiter:
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.interval = 1e9 / rate  # ns between two messages
+        self.start = None  # ns, start of the current schedule
+        self.sent = 0  # messages sent in the current schedule
+        self.total = 0
+        self.active = 0  # ns spent in the previous schedules
+        self.last = None  # ns, time of the last message of the current schedule
+        self.lag = 0  # ns, sum of the lag of all messages
+        self.max_lag = 0
+        self.pending = collections.deque()  # values waiting for their turn, see pace
+
+    # Number of messages that may be written now, starts the schedule on the first call
+    def due(self):
+        now = time.perf_counter_ns()
+        if self.start is None:
+            self.start = now
+        return max(int((now - self.start) / self.interval) + self.burst - self.sent, 0)
+
+    # Time the n-th message of the schedule was due, in perf_counter_ns
+    def scheduled(self, n):
+        return self.start + int(max(n + 1 - self.burst, 0) * self.interval)
+
+    def sent_count(self, n):
+        now = time.perf_counter_ns()
+        for i in range(self.sent, self.sent + n):
+            lag = now - self.scheduled(i)
+            if lag > 0:
+                self.lag += lag
+                if lag > self.max_lag:
+                    self.max_lag = lag
+        self.sent += n
+        self.total += n
+        if n:
+            self.last = now
+
+    # Seconds until the next message is due
+    def timeout(self):
+        if self.start is None:
+            return 0
+        return max(self.scheduled(self.sent) - time.perf_counter_ns(), 0) / 1e9
+
+    # Stop the schedule when the input runs dry, it restarts with the next input.
+    # Waiting for input is not lag, and catching up afterwards would exceed the rate.
+    def idle(self):
+        self.active = self.active_time()
+        self.start = self.last = None
+        self.sent = 0
+
+    # Time spent writing, every message takes one interval so a single burst doesn't count as zero time
+    def active_time(self):
+        if self.last is None:
+            return self.active
+        return self.active + self.last - self.start + self.interval
+
+    # Queue the values and return the ones that are due, in order
+    def pace(self, values):
+        pending = self.pending
+        pending.extend(values)
+        if not pending:
+            self.idle()
+            return []
+        count = min(self.due(), len(pending))
+        self.sent_count(count)
+        return [pending.popleft() for _ in range(count)]
+
+    def achieved(self):
+        active = self.active_time()
+        return self.total / active * 1e9 if active else 0
+
+    # Print the target and achieved rate to stderr so the subscribed samples on stdout are not affected
+    def report(self):
+        mean_lag = self.lag / self.total / 1e6 if self.total else 0
+        print(f"Rate: target {self.rate:g} messages/s, achieved {self.achieved():.1f} messages/s, " +
+              f"lag mean {mean_lag:.3f}ms max {self.max_lag / 1e6:.3f}ms", file=sys.stderr)
@@ -0,0 +1,114 @@
+import os
+import sys
+import json
+import base64
+import typing
+import importlib
+import importlib.util
+import dataclasses
+import collections.abc
+
+
+# Converter from a JSON value to a field of the given annotation, built once per field
+def field_parser(annotation):
+    origin = typing.get_origin(annotation)
+    if origin is typing.Annotated:
+        return field_parser(typing.get_args(annotation)[0])
+    if origin in (list, collections.abc.Sequence):
+        parse_element = field_parser(typing.get_args(annotation)[0])
+        return lambda value: [parse_element(v) for v in value]
+    if annotation is bytes:
+        return base64.b64decode  # Blobs are base64 in the input, like in the ndjson output
+    if annotation in (int, float, str, bool):
+        return annotation
+    if dataclasses.is_dataclass(annotation):
+        return UserType(annotation).parse
+    return lambda value: value
+
+
+# Value of a field that is missing from the input: zero, empty or an array of zeros
+def empty_value(annotation):
+    origin = typing.get_origin(annotation)
+    if origin is typing.Annotated:
+        base = typing.get_args(annotation)[0]
+        length = getattr(annotation.__metadata__[0], "length", None)
+        if length and typing.get_origin(base) in (list, collections.abc.Sequence):
+            return [empty_value(typing.get_args(base)[0])] * length
+        return empty_value(base)
+    if origin in (list, collections.abc.Sequence):
+        return []
+    if dataclasses.is_dataclass(annotation):
+        return UserType(annotation).empty()
+    if annotation in (int, float, str, bool, bytes):
+        return annotation()
+    return None
+
+
+# A @cdr class of a user module with the parser of every field, so parsing an input is a single pass
+class UserType:
+    def __init__(self, datastruct):
+        self.datastruct = datastruct
+        hints = typing.get_type_hints(datastruct, include_extras=True)
+        self.fields = [(f.name, field_parser(hints[f.name]), empty_value(hints[f.name]))
+                       for f in dataclasses.fields(datastruct)]
+        # Samples with a seq field are numbered by TopicManager like the built-in types
+        self.has_seq = hints.get("seq") is int
+
+    def parse(self, values):
+        return self.datastruct(*[parse(values[name]) if name in values else empty
+                                 for name, parse, empty in self.fields])
+
+    def empty(self):
+        return self.datastruct(*[empty for _, _, empty in self.fields])
+
+
+# Import a module by name or from the path of a .py file
+def import_module(name):
+    if name.endswith(".py"):
+        module_name = os.path.splitext(os.path.basename(name))[0]
+        spec = importlib.util.spec_from_file_location(module_name, name)
+        if spec is None:
+            raise ImportError(f"No module at {name}")
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        spec.loader.exec_module(module)
+        return module
+    return importlib.import_module(name)
+
+
+# Type name -> UserType of the @cdr classes defined in a user module, published on topic + type name.
+# The input is one JSON object per line with the fields of a sample and its type name in "type",
+# which may be left out when the module has a single type.
+class TypeRegistry:
+    def __init__(self, module_name):
+        try:
+            module = import_module(module_name)
+        except Exception as e:
+            raise SystemExit(f"Error: Could not import {module_name}: {e}")
+        self.types = {name: UserType(value) for name, value in vars(module).items()
+                      if isinstance(value, type) and value.__module__ == module.__name__
+                      and dataclasses.is_dataclass(value) and hasattr(value, "serialize")}
+        if not self.types:
+            raise SystemExit(f"Error: No @cdr types in {module_name}")
+        self.default = next(iter(self.types.values())) if len(self.types) == 1 else None
+
+    # Datastruct of every type name, for TopicManager
+    def datastructs(self):
+        return {name: user_type.datastruct for name, user_type in self.types.items()}
+
+    def parse_line(self, line):
+        try:
+            values = json.loads(line)
+        except ValueError:
+            raise Exception(f"Invalid input: {line.strip()} is not a JSON object")
+        if type(values) is not dict:
+            raise Exception(f"Invalid input: {line.strip()} is not a JSON object")
+        name = values.pop("type", None)
+        user_type = self.types.get(name) if name else self.default
+        if user_type is None:
+            problem = f"unknown type {name}" if name else "missing \"type\""
+            raise Exception(f"Invalid input: {problem} (choose from {', '.join(self.types)})")
+        try:
+            return user_type.parse(values)
+        except (ValueError, TypeError) as e:
+            raise Exception(f"Invalid input: {line.strip()}: {e}")
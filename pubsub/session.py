@@ -0,0 +1,81 @@
+import asyncio
+import concurrent.futures
+
+from util import create_parser
+from check_entity_qos import entity_qos
+from check_qos_compat import check_qos
+from parse_qos import QosParser, dds_infinity
+from qos_profile import load_profile
+from pubsub_topic import TopicManager
+from cyclonedds.core import WaitSet, GuardCondition
+from cyclonedds.domain import DomainParticipant
+from cyclonedds.qos import Qos, Policy
+
+
+# Asyncio interface to pubsub, takes the same arguments as the command line tool:
+#
+#     async with PubSubSession(["-T", "topic", "-q", "Reliability.Reliable"]) as session:
+#         await session.write(420)
+#         async for sample in session.samples():
+#             ...
+class PubSubSession:
+    def __init__(self, sys_args, dp=None):
+        eqos = [None] * 5
+        self.args = create_parser(sys_args)
+        if self.args.qos_profile:
+            _, eqos = load_profile(self.args.qos_file, self.args.qos_profile)
+        elif self.args.qos:
+            qos = QosParser.parse(self.args.qos)
+            eqos = entity_qos(qos, self.args.entityqos)
+        remotes = [(f"profile {name}", load_profile(self.args.qos_file, name)[1]) for name in self.args.check_qos or []]
+        check_qos(eqos, remotes, strict=self.args.check_qos is not None)
+        # A participant of the caller is left to the caller, one created here is deleted by close
+        self.owns_dp = dp is None
+        self.dp = dp or DomainParticipant(self.args.domain, qos=Qos(Policy.IgnoreLocal.Process))
+        self.waitset = WaitSet(self.dp)
+        self.managers = [TopicManager(self.args, self.dp, eqos, self.waitset, topic) for topic in self.args.topic]
+        # Wakes up the waiting thread when the session is closed
+        self.close_cond = GuardCondition(self.dp)
+        self.waitset.attach(self.close_cond)
+        # The waitset blocks in its own thread, so the event loop is never blocked or polling
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.closed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    # Values are written to every topic of the session
+    async def write(self, value):
+        for manager in self.managers:
+            manager.write(value)
+
+    async def write_batch(self, values):
+        return sum(manager.write_batch(values) for manager in self.managers)
+
+    # Yield received samples of all types and topics until the session is closed, meant for a single consumer.
+    # The readers are taken from before yielding, they may be deleted while the consumer holds a sample.
+    async def samples(self):
+        loop = asyncio.get_running_loop()
+        while not self.closed:
+            samples = [sample for manager in self.managers for sample in manager.take()]
+            for sample in samples:
+                yield sample
+            if self.closed:
+                break
+            await loop.run_in_executor(self.executor, self.waitset.wait, dds_infinity)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.close_cond.set(True)
+            # The waiting thread leaves the waitset before its entities go away
+            self.executor.shutdown(wait=self.owns_dp)
+            # Without references the binding deletes the readers, writers and waitset, and the participant
+            # when the session created it
+            self.managers = []
+            self.waitset = self.close_cond = None
+            if self.owns_dp:
+                self.dp = None
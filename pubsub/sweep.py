@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+import os
+import re
+import sys
+import csv
+import json
+import time
+import queue
+import signal
+import argparse
+import itertools
+import tempfile
+import subprocess
+import concurrent.futures
+
+from parse_qos import QosParser
+
+
+pubsub = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pubsub.py")
+settle_time = 1  # Seconds the reader gets to start before the writer starts
+drain_time = 1  # Seconds the reader keeps taking the samples in flight after the writer stopped
+
+# The totals the reader prints at exit, see ReceiveCounters and LatencyReport
+writer_line = re.compile(r"^sweep writer \S+: received (\d+) \((\d+) bytes\) dup (\d+) ooo (\d+) lost (\d+)$")
+latency_line = re.compile(r"^sweep total: latency (\d+) samples p50 ([\d.]+)us p99 ([\d.]+)us " +
+                          r"p99\.9 ([\d.]+)us max ([\d.]+)us$")
+
+
+# Last line of the stderr of a failed process
+def failure(returncode, stderr):
+    stderr = (stderr or "").strip()
+    return stderr.splitlines()[-1] if stderr else f"exit status {returncode}"
+
+
+# Run a writer and a reader process with one QoS combination on a domain of their own.
+# The writer is a single pubsub worker, the reader counts and times what arrives, so the reliability,
+# durability and history of the combination apply between two matched endpoints.
+def run_combination(combination, domains, args):
+    domain = domains.get()
+    common = ["-T", "sweep", "--domain", str(domain), "-q", *combination]
+    if args.types:
+        common += ["--types", args.types]
+    reader_command = [sys.executable, pubsub, *common, "--stats", "3600", "--latency", "3600", "-o", os.devnull]
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "writer.json")
+            writer_command = [sys.executable, pubsub, *common, "--workers", "1", "--latency", "1",
+                              "--runtime", str(args.duration), "--bench-size", str(args.bench_size),
+                              "--bench-output", output]
+            if args.rate:
+                writer_command += ["--rate", str(args.rate)]
+            reader = subprocess.Popen(reader_command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                      stderr=subprocess.PIPE, text=True)
+            try:
+                time.sleep(settle_time)
+                writer = subprocess.run(writer_command, stdin=subprocess.DEVNULL, capture_output=True, text=True,
+                                        timeout=args.timeout)
+                if writer.returncode:
+                    return combination, None, f"writer: {failure(writer.returncode, writer.stderr)}"
+                time.sleep(drain_time)
+                # The reader prints its totals when interrupted
+                reader.send_signal(signal.SIGINT)
+                _, stderr = reader.communicate(timeout=args.timeout)
+            except subprocess.TimeoutExpired:
+                return combination, None, f"timeout after {args.timeout}s"
+            finally:
+                if reader.poll() is None:
+                    reader.kill()
+                    reader.wait()
+            if reader.returncode:
+                return combination, None, f"reader: {failure(reader.returncode, stderr)}"
+            with open(output) as f:
+                written = json.load(f)
+        return combination, reader_results(written, stderr), None
+    finally:
+        domains.put(domain)
+
+
+# The results of a combination: what the writer wrote, and what the reader received, lost and its latency
+def reader_results(written, stderr):
+    received = size = duplicates = out_of_order = lost = 0
+    latency = [0, None, None, None, None]
+    for line in stderr.splitlines():
+        match = writer_line.match(line)
+        if match:
+            counts = [int(v) for v in match.groups()]
+            received += counts[0]
+            size += counts[1]
+            duplicates += counts[2]
+            out_of_order += counts[3]
+            lost += counts[4]
+        match = latency_line.match(line)
+        if match:
+            latency = [int(match.group(1))] + [float(v) for v in match.groups()[1:]]
+    return {
+        "written": written["written"],
+        "received": received,
+        "bytes": size,
+        "lost": lost,
+        "dup": duplicates,
+        "ooo": out_of_order,
+        "write_rate": written["write_rate"],
+        "receive_rate": received / written["duration"] if written["duration"] else None,
+        "latency_p50_us": latency[1],
+        "latency_p99_us": latency[2],
+        "latency_p99.9_us": latency[3],
+        "latency_max_us": latency[4]
+    }
+
+
+# One row per combination: the expression of every axis, then the results
+def result_row(axes, combination, results, error):
+    row = dict(zip(axes, combination))
+    if error:
+        return {**row, "error": error}
+    return {**row, **results}
+
+
+def write_rows(rows, filename, format):
+    file = open(filename, "w", newline="") if filename else sys.stdout
+    try:
+        if format == "json":
+            json.dump(rows, file, indent=4)
+            file.write("\n")
+        else:
+            columns = []
+            for row in rows:
+                columns += [k for k in row if k not in columns]
+            writer = csv.DictWriter(file, columns, lineterminator="\n")
+            writer.writeheader()
+            writer.writerows(rows)
+    finally:
+        if filename:
+            file.close()
+
+
+def main(sys_args):
+    parser = argparse.ArgumentParser(formatter_class=argparse.RawTextHelpFormatter,
+                                     description="Run a pubsub writer and reader for every combination of a grid " +
+                                     "of QoS, in parallel,\nand compare what the readers received.")
+    parser.add_argument("-g", "--grid", nargs="+", action="append", required=True, metavar="QOS",
+                        help="One axis of the grid: the --qos expressions to try, for example\n" +
+                        "-g Reliability.BestEffort \"Reliability.Reliable 1\" -g \"History.KeepLast 1\" " +
+                        "History.KeepAll")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), metavar="N",
+                        help="Number of combinations run at the same time. (default: number of CPUs)")
+    parser.add_argument("--domain-base", type=int, default=100, metavar="ID",
+                        help="Every running combination has its own domain ID, starting at ID. (default: 100)")
+    parser.add_argument("--duration", type=float, default=5, metavar="SECONDS",
+                        help="Seconds the writer of every combination writes. (default: 5)")
+    parser.add_argument("--rate", type=float, metavar="X",
+                        help="Samples per second the writer writes. (default: as fast as possible)")
+    parser.add_argument("--bench-size", type=int, default=16, metavar="N",
+                        help="Size of the strings, sequences and blobs. (default: 16)")
+    parser.add_argument("--types", type=str, metavar="TYPE[,TYPE...]", help="Only write these types.")
+    parser.add_argument("--timeout", type=float, default=300, metavar="SECONDS",
+                        help="Give up on a combination after SECONDS. (default: 300)")
+    parser.add_argument("--format", choices=["csv", "json"], default="csv", help="(default: csv)")
+    parser.add_argument("-o", "--output", type=str, metavar="FILE", help="Write the matrix to a file.")
+    args = parser.parse_args(sys_args)
+    if args.jobs < 1:
+        raise SystemExit("Error: The number of jobs should be at least 1")
+    if args.duration <= 0:
+        raise SystemExit("Error: The duration should be positive")
+    if args.domain_base < 0 or args.domain_base + args.jobs > 233:
+        raise SystemExit("Error: The domain IDs of the jobs should be between 0 and 232")
+
+    # Fail on a typo before starting any process
+    for axis in args.grid:
+        for expression in axis:
+            try:
+                QosParser.parse([expression])
+            except Exception as e:
+                raise SystemExit(f"Error: Invalid QoS {expression}: {e}")
+    combinations = list(itertools.product(*args.grid))
+    # The columns are named after the policy of every axis, or by position when two axes set the same policy
+    axes = [axis[0].split()[0].split(".")[0] for axis in args.grid]
+    if len(set(axes)) != len(axes):
+        axes = [f"axis{i}" for i in range(len(args.grid))]
+
+    domains = queue.Queue()
+    for domain in range(args.domain_base, args.domain_base + args.jobs):
+        domains.put(domain)
+    rows = []
+    # The writers and readers are processes of their own, the threads only wait for them
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        futures = [pool.submit(run_combination, combination, domains, args) for combination in combinations]
+        for i, future in enumerate(futures):
+            combination, results, error = future.result()
+            print(f"[{i + 1}/{len(combinations)}] {' '.join(combination)}: {error or 'done'}", file=sys.stderr)
+            rows.append(result_row(axes, combination, results, error))
+    write_rows(rows, args.output, args.format)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -5,6 +5,7 @@ import io
 import asyncio
 import concurrent
 
+import json
 import subprocess
 
 from cyclonedds.core import Qos, Policy
@@ -92,6 +93,395 @@ def test_pubsub_topics():
     assert "StrSequence(seq=5, keyval=['test', 'string', 'sequence'])" in pubsub["stdout"]
 
 
+def test_pubsub_batch():
+    pubsub = run_pubsub(["-T", "test", "--runtime", "1", "--batch", "4"])
+
+    assert "String(seq=0, keyval='test')" in pubsub["stdout"]
+    assert "Integer(seq=1, keyval=420)" in pubsub["stdout"]
+    assert "StrSequence(seq=5, keyval=['test', 'string', 'sequence'])" in pubsub["stdout"]
+    assert "Published 6 samples in" in pubsub["stderr"]
+    assert "samples/s" in pubsub["stderr"]
+
+
+def test_pubsub_rate():
+    pubsub = run_pubsub(["-T", "test", "--runtime", "2", "--rate", "10", "--burst", "2"])
+
+    assert "String(seq=0, keyval='test')" in pubsub["stdout"]
+    assert "StrSequence(seq=5, keyval=['test', 'string', 'sequence'])" in pubsub["stdout"]
+    assert "Rate: target 10 messages/s, achieved" in pubsub["stderr"]
+
+    pubsub = run_pubsub(["-T", "test", "--burst", "2"])
+    assert "Error: The following argument is required: --rate" in pubsub["stderr"]
+
+
+def test_pubsub_stats():
+    pubsub = run_pubsub(["-T", "test", "--runtime", "2", "--stats", "1"])
+
+    assert "test: received 6 (" in pubsub["stderr"]
+    assert "dup 0 ooo 0 lost 0" in pubsub["stderr"]
+    assert "test writer " in pubsub["stderr"]
+
+
+def test_pubsub_stats_publishers():
+    # Both publishers start at seq 0 and number their int and str samples together, the seq is tracked
+    # per publishing participant instead of per topic or per writer
+    args = ["-T", "test_stats", "-q", "Durability.TransientLocal", "Reliability.Reliable", "seconds=1"]
+    with concurrent.futures.ThreadPoolExecutor() as pool:
+        subscriber = pool.submit(run_pubsub, args + ["--runtime", "4", "--stats", "1"], text=None)
+        publishers = [pool.submit(run_pubsub, args + ["--runtime", "2"], text="1 test 3") for _ in range(2)]
+        for publisher in publishers:
+            publisher.result()
+        pubsub = subscriber.result()
+
+    writers = [line for line in pubsub["stderr"].splitlines() if line.startswith("test_stats writer ")]
+    assert len(writers) == 2
+    for line in writers:
+        assert "received 3 (" in line
+        assert line.endswith("dup 0 ooo 0 lost 0")
+
+
+def test_receive_counters(capsys):
+    sys.path.append(os.path.join(os.path.dirname(__file__), "..", "tools", "pubsub"))
+    from types import SimpleNamespace
+    from counters import ReceiveCounters, SeqTracker
+    from cyclonedds.domain import DomainParticipant
+
+    def sample(handle, seq, keyval):
+        return SimpleNamespace(seq=seq, keyval=keyval,
+                               sample_info=SimpleNamespace(valid_data=True, publication_handle=handle))
+
+    # A seq below the first one that arrived is late, a seq that arrived before is a duplicate
+    tracker = SeqTracker()
+    for seq in [1, 3, 0, 2, 2]:
+        tracker.add(seq)
+    assert (tracker.duplicates, tracker.out_of_order, tracker.lost) == (1, 2, 0)
+
+    dp = DomainParticipant()
+    counters = ReceiveCounters(3600, dp)
+    # A take drains the int reader before the str reader, the samples are counted in seq order
+    counters.add("test", [sample(7, 1, 420), sample(7, 3, 421), sample(7, 0, "test"), sample(7, 2, "test")])
+    # The samples of a writer wait for its discovery, the seq of one publisher is never split
+    counters.participants[7] = "participant"
+    counters.add("test", [sample(7, 4, 422)])
+    # A writer that is never discovered counts as a participant of its own at exit
+    counters.add("test", [sample(8, 0, 420)])
+    counters.report(final=True)
+
+    writers = sorted(line for line in capsys.readouterr().err.splitlines() if line.startswith("test writer "))
+    assert writers == ["test writer 8: received 1 (16 bytes) dup 0 ooo 0 lost 0",
+                       "test writer participant: received 5 (82 bytes) dup 0 ooo 0 lost 0"]
+
+
+def test_pubsub_latency():
+    pubsub = run_pubsub(["-T", "test", "--runtime", "2", "--latency", "1"])
+
+    assert "TimedInteger(seq=1, keyval=420, ts=" in pubsub["stdout"]
+    assert "test total: latency 6 samples p50 " in pubsub["stderr"]
+
+    pubsub = run_pubsub(["-T", "test", "--latency", "1", "--instances", "2"])
+    assert "Error: --latency can't be combined with --instances" in pubsub["stderr"]
+
+
+def test_pubsub_type_module(tmp_path):
+    module = tmp_path / "usertypes.py"
+    module.write_text("from pycdr import cdr\nfrom pycdr.types import sequence\n\n\n" +
+                      "@cdr\nclass Reading:\n    seq: int\n    sensor: str\n    values: sequence[float]\n")
+
+    pubsub = run_pubsub(["-T", "test", "--runtime", "1", "--type-module", str(module)],
+                        text='{"sensor": "t1", "values": [1.5, 2]}\n{"type": "Reading", "sensor": "t2"}\n')
+    assert "Reading(seq=0, sensor='t1', values=[1.5, 2.0])" in pubsub["stdout"]
+    assert "Reading(seq=1, sensor='t2', values=[])" in pubsub["stdout"]
+
+    pubsub = run_pubsub(["-T", "test", "--type-module", str(tmp_path / "missing.py")])
+    assert "Error: Could not import" in pubsub["stderr"]
+
+
+def test_pubsub_input_tokens():
+    pubsub = run_pubsub(["-T", "test", "--runtime", "1"], text="[1, 2, 3] 'quoted string' [\"a\", b,\nc, d, e] tail")
+
+    assert "IntArray(seq=0, keyval=[1, 2, 3])" in pubsub["stdout"]
+    assert "String(seq=1, keyval='quoted string')" in pubsub["stdout"]
+    assert "StrArray(seq=2, keyval=['a', 'b', 'c', 'd', 'e'])" in pubsub["stdout"]
+    assert "String(seq=3, keyval='tail')" in pubsub["stdout"]
+
+
+def test_pubsub_lazy_entities():
+    sys.path.append(os.path.join(os.path.dirname(__file__), "..", "tools", "pubsub"))
+    from session import PubSubSession
+
+    async def entities(args, value):
+        async with PubSubSession(["-T", "test_lazy"] + args) as session:
+            manager = session.managers[0]
+            created = set(manager.writers)
+            await session.write(value)
+            async for sample in session.samples():
+                return created, set(manager.writers), set(manager.readers), str(sample)
+
+    loop = asyncio.get_event_loop()
+    created, writers, readers, sample = loop.run_until_complete(
+        asyncio.wait_for(entities(["--lazy"], 420), timeout=10))
+    assert created == set()
+    assert writers == readers == {"int"}
+    assert sample == "Integer(seq=0, keyval=420)"
+
+    created, writers, readers, sample = loop.run_until_complete(
+        asyncio.wait_for(entities(["--types", "int,str"], [1, 2]), timeout=10))
+    assert created == {"int", "str"}
+    assert writers == readers == {"int", "str", "int_seq"}
+    assert sample == "IntSequence(seq=0, keyval=[1, 2])"
+
+    pubsub, ddsls = run_pubsub_ddsls(["-T", "test", "--types", "int"], ["-t", "dcpspublication"], runtime=3)
+    assert "testint" in ddsls["stdout"]
+    assert "String(seq=0, keyval='test')" in pubsub["stdout"]
+    assert "StrSequence(seq=5, keyval=['test', 'string', 'sequence'])" in pubsub["stdout"]
+
+    pubsub = run_pubsub(["-T", "test", "--types", "int,float"])
+    assert "invalid type 'float'" in pubsub["stderr"]
+
+
+def test_pubsub_read_conditions():
+    sys.path.append(os.path.join(os.path.dirname(__file__), "..", "tools", "pubsub"))
+    from session import PubSubSession
+
+    taken = []
+
+    class Reader:
+        def __init__(self, name, reader):
+            self.name = name
+            self.reader = reader
+
+        def take(self, **kwargs):
+            taken.append(self.name)
+            return self.reader.take(**kwargs)
+
+    async def roundtrip():
+        async with PubSubSession(["-T", "test_conds"]) as session:
+            manager = session.managers[0]
+            names = {id(reader): name for name, reader in manager.readers.items()}
+            for read_cond, reader in manager.read_conds.items():
+                manager.read_conds[read_cond] = Reader(names[id(reader)], reader)
+            await session.write("test")
+            async for sample in session.samples():
+                return str(sample)
+
+    # Only the str reader triggers, the waitset wakes up for it and the other readers aren't taken from
+    loop = asyncio.get_event_loop()
+    sample = loop.run_until_complete(asyncio.wait_for(roundtrip(), timeout=10))
+    assert sample == "String(seq=0, keyval='test')"
+    assert taken == ["str"]
+
+    pubsub = run_pubsub(["-T", "test"], text="[]")
+    assert "Exception: TypeError: Empty list" in pubsub["stderr"]
+
+
+def test_pubsub_session():
+    sys.path.append(os.path.join(os.path.dirname(__file__), "..", "tools", "pubsub"))
+    from session import PubSubSession
+    from cyclonedds.domain import DomainParticipant
+
+    async def roundtrip():
+        async with PubSubSession(["-T", "test_session"]) as session:
+            await session.write(420)
+            await session.write("test")
+            received = []
+            async for sample in session.samples():
+                received.append(str(sample))
+                if len(received) == 2:
+                    break
+            return session, received
+
+    loop = asyncio.get_event_loop()
+    session, received = loop.run_until_complete(asyncio.wait_for(roundtrip(), timeout=10))
+    assert "Integer(seq=0, keyval=420)" in received
+    assert "String(seq=1, keyval='test')" in received
+    # Closing lets go of all entities, a participant the session created included
+    assert session.managers == [] and session.waitset is None and session.dp is None
+
+    # A participant of the caller is left to the caller
+    dp = DomainParticipant()
+    session = PubSubSession(["-T", "test_session"], dp=dp)
+    session.close()
+    assert session.managers == [] and session.dp is dp
+
+
+def test_pubsub_bench():
+    pubsub = run_pubsub(["-T", "test", "--bench", "--bench-count", "200", "--bench-size", "8"], text=None)
+    assert pubsub["status"] == 0
+
+    results = json.loads(pubsub["stdout"])
+    assert [result["type"] for result in results["results"]] == ["int", "str", "int_array",
+                                                                  "str_array", "int_seq", "str_seq", "blob"]
+    for result in results["results"]:
+        assert result["count"] == 200
+        assert result["received"] > 0
+        assert result["write_rate"] > 0
+        assert result["latency_us"]["p50"] <= result["latency_us"]["max"]
+
+
+def test_sweep(tmp_path):
+    filename = tmp_path / "sweep.json"
+    process = subprocess.run(["python3", os.path.join(os.path.dirname(__file__), "..", "tools", "pubsub", "sweep.py"),
+                              "-g", "Reliability.BestEffort", "Reliability.Reliable 1", "-g", "History.KeepLast 10",
+                              "--types", "int", "--duration", "1", "--rate", "100", "-j", "2", "--format", "json",
+                              "-o", str(filename)], capture_output=True, timeout=60)
+    assert process.returncode == 0
+
+    rows = json.loads(filename.read_text())
+    assert [(row["Reliability"], row["History"]) for row in rows] == [
+        ("Reliability.BestEffort", "History.KeepLast 10"),
+        ("Reliability.Reliable 1", "History.KeepLast 10")
+    ]
+    # The numbers come from the reader process of every combination
+    for row in rows:
+        assert "error" not in row
+        assert row["written"] > 0
+        assert 0 < row["received"] <= row["written"]
+        assert row["latency_p50_us"] is not None
+    assert rows[1]["lost"] == 0
+
+    # All types of a topic share its seq, a reliable writer of several types loses and repeats nothing
+    process = subprocess.run(["python3", os.path.join(os.path.dirname(__file__), "..", "tools", "pubsub", "sweep.py"),
+                              "-g", "Reliability.Reliable 1", "--types", "int,str,int_seq", "--duration", "1",
+                              "--rate", "300", "-j", "1", "--format", "json", "-o", str(filename)],
+                              capture_output=True, timeout=60)
+    assert process.returncode == 0
+
+    rows = json.loads(filename.read_text())
+    assert len(rows) == 1
+    assert rows[0]["received"] > 0
+    assert rows[0]["lost"] == rows[0]["dup"] == 0
+
+
+def test_pubsub_input_file(tmp_path):
+    filename = tmp_path / "input.txt"
+    filename.write_text("test\n@0.5\n420")
+
+    pubsub = run_pubsub(["-T", "test", "--runtime", "2", "-i", str(filename), "--loop", "2"], text=None)
+    assert "String(seq=0, keyval='test')" in pubsub["stdout"]
+    assert "Integer(seq=1, keyval=420)" in pubsub["stdout"]
+    assert "String(seq=2, keyval='test')" in pubsub["stdout"]
+    assert "Integer(seq=3, keyval=420)" in pubsub["stdout"]
+
+    pubsub = run_pubsub(["-T", "test", "-i", str(tmp_path / "missing.txt")], text=None)
+    assert "Could not open file" in pubsub["stderr"]
+
+
+def test_pubsub_blob(tmp_path):
+    filename = tmp_path / "input.bin"
+    filename.write_bytes(bytes(10))
+
+    pubsub = run_pubsub(["-T", "test", "--runtime", "1", "-i", str(filename), "--blob-size", "4"], text=None)
+    assert "Blob(seq=0, keyval=<4 bytes>)" in pubsub["stdout"]
+    assert "Blob(seq=2, keyval=<2 bytes>)" in pubsub["stdout"]
+
+    pubsub = run_pubsub(["-T", "test", "--runtime", "1", "-i", str(filename), "--blob-size", "4", "--format", "ndjson"],
+                        text=None)
+    samples = [json.loads(line) for line in pubsub["stdout"].splitlines()]
+    assert {"type": "Blob", "seq": 1, "keyval": "AAAAAA=="} in samples
+
+    pubsub = run_pubsub(["-T", "test", "--blob-size", "4"], text=None)
+    assert "Error: The following argument is required: -i/--input-file" in pubsub["stderr"]
+
+    pubsub = run_pubsub(["-T", "test", "-i", str(filename), "--blob-size", "4", "--replay-rate", "0"], text=None)
+    assert "Error: --replay-rate can't be combined with --blob-size" in pubsub["stderr"]
+
+
+def test_pubsub_numpy(tmp_path):
+    numpy = pytest.importorskip("numpy")
+    filename = tmp_path / "input.npy"
+    numpy.save(filename, numpy.array([[4, 2, 0], [1, 2, 3]]))
+
+    pubsub = run_pubsub(["-T", "test", "--runtime", "1", "-i", str(filename)], text=None)
+    assert "IntArray(seq=0, keyval=[4, 2, 0])" in pubsub["stdout"]
+    assert "IntArray(seq=1, keyval=[1, 2, 3])" in pubsub["stdout"]
+
+    sys.path.append(os.path.join(os.path.dirname(__file__), "..", "tools", "pubsub"))
+    from session import PubSubSession
+
+    async def roundtrip():
+        async with PubSubSession(["-T", "test_numpy", "--numpy"]) as session:
+            await session.write(numpy.arange(5))
+            async for sample in session.samples():
+                return sample
+
+    loop = asyncio.get_event_loop()
+    sample = loop.run_until_complete(asyncio.wait_for(roundtrip(), timeout=10))
+    assert type(sample.keyval) is numpy.ndarray
+    assert sample.keyval.tolist() == [0, 1, 2, 3, 4]
+
+
+def test_pubsub_output_formats(tmp_path):
+    pubsub = run_pubsub(["-T", "test", "--runtime", "1", "--format", "ndjson"])
+    samples = [json.loads(line) for line in pubsub["stdout"].splitlines()]
+    assert {"type": "Integer", "seq": 1, "keyval": 420} in samples
+    assert {"type": "IntSequence", "seq": 4, "keyval": [-1, 183]} in samples
+
+    filename = tmp_path / "output.csv"
+    pubsub = run_pubsub(["-T", "test", "--runtime", "1", "--format", "csv", "-o", str(filename)])
+    assert pubsub["stdout"] == ""
+    rows = filename.read_text().splitlines()
+    assert "String,0,test" in rows
+    assert 'StrArray,3,"[""test"", ""str"", ""array"", ""data"", ""struct""]"' in rows
+
+    pubsub = run_pubsub(["-T", "test", "--runtime", "1", "--summary", "5"])
+    assert "Subscriberd" not in pubsub["stdout"]
+    assert "received 6 " in pubsub["stdout"]
+    assert "Integer=1" in pubsub["stdout"]
+
+
+def test_pubsub_multiple_topics(tmp_path):
+    pubsub = run_pubsub(["-T", "test_a", "test_b", "--runtime", "1", "--threads", "2"], text="420")
+    assert "Subscriberd: test_a: Integer(seq=0, keyval=420)" in pubsub["stdout"]
+    assert "Subscriberd: test_b: Integer(seq=0, keyval=420)" in pubsub["stdout"]
+
+    filename = tmp_path / "topics.txt"
+    filename.write_text("test_a\ntest_b\ntest_c\n")
+    pubsub = run_pubsub(["-T", f"@{filename}", "test_a", "--runtime", "1", "--format", "ndjson"], text="test")
+    samples = [json.loads(line) for line in pubsub["stdout"].splitlines()]
+    assert len(samples) == 3
+    assert {"topic": "test_c", "type": "String", "seq": 0, "keyval": "test"} in samples
+
+
+def test_pubsub_workers():
+    pubsub = run_pubsub(["-T", "test", "--workers", "2", "--runtime", "3", "--types", "int,str"], text=None)
+    assert pubsub["status"] == 0
+    assert "written" in pubsub["stderr"]
+
+    report = json.loads(pubsub["stdout"])
+    assert report["workers"] == 2
+    assert report["written"] > 0
+    assert report["received"] > 0
+    assert report["latency_us"]["p50"] <= report["latency_us"]["max"]
+
+
+def test_pubsub_instances():
+    pubsub = run_pubsub(["-T", "test", "--runtime", "1", "--instances", "2"], text="1 2 3")
+    assert "KeyedInteger(seq=0, keyval=1, id=0) [alive]" in pubsub["stdout"]
+    assert "KeyedInteger(seq=1, keyval=2, id=1) [alive]" in pubsub["stdout"]
+    assert "KeyedInteger(seq=2, keyval=3, id=0) [alive]" in pubsub["stdout"]
+
+    pubsub, ddsls = run_pubsub_ddsls(["-T", "test", "--instances", "4", "--instance-exit", "dispose"],
+                                     ["-t", "dcpspublication"], runtime=3)
+    assert "testkeyed_int" in ddsls["stdout"]
+    assert "KeyedStrSequence(seq=5, keyval=['test', 'string', 'sequence'], id=1) [alive]" in pubsub["stdout"]
+
+
+@pytest.mark.parametrize("instance_exit, state", [("dispose", "disposed"), ("unregister", "no_writers")])
+def test_pubsub_instance_exit(instance_exit, state):
+    # Transient local, so the subscriber gets the samples written before the processes discovered each other
+    args = ["-T", f"test_{instance_exit}", "--instances", "2",
+            "-q", "Durability.TransientLocal", "Reliability.Reliable", "seconds=1"]
+    with concurrent.futures.ThreadPoolExecutor() as pool:
+        subscriber = pool.submit(run_pubsub, args + ["--runtime", "4"], text=None)
+        publisher = pool.submit(run_pubsub, args + ["--runtime", "2", "--instance-exit", instance_exit], text="1 2")
+        publisher.result()
+        pubsub = subscriber.result()
+
+    assert "KeyedInteger(seq=0, keyval=1, id=0) [alive]" in pubsub["stdout"]
+    assert "KeyedInteger(seq=1, keyval=2, id=1) [alive]" in pubsub["stdout"]
+    assert f"[{state}]" in pubsub["stdout"]
+
+
 def test_parse_qos():
     tests = [
                 (
@@ -190,6 +580,82 @@ def test_parse_qos_compatible_expressions():
             assert str(policy) in ddsls["stdout"]
 
 
+def test_parse_qos_cache():
+    sys.path.append(os.path.join(os.path.dirname(__file__), "..", "tools", "pubsub"))
+    from parse_qos import QosParser
+
+    qos = QosParser.parse(["Reliability.Reliable 10", "History.KeepLast 10"])
+    assert QosParser.parse(["Reliability.Reliable: 10, History.KeepLast 10"]) is qos
+    assert qos == Qos(Policy.Reliability.Reliable(max_blocking_time=10), Policy.History.KeepLast(depth=10))
+    with pytest.raises(Exception, match="DurabilityService takes a History policy"):
+        QosParser.parse(["DurabilityService 10 Reliability.Reliable 1"])
+
+
+def test_qos_profile(tmp_path):
+    filename = tmp_path / "profiles.json"
+    filename.write_text(json.dumps({"profile": {"qos": ["Durability.TransientLocal", "Userdata HelloProfile"]}}))
+
+    for _ in range(2):  # The second launch uses the cache
+        pubsub, ddsls = run_pubsub_ddsls(["-T", "test", "--qos-profile", "profile", "--qos-file", str(filename)],
+                                         ["-a"],
+                                         runtime=3)
+        assert str(Policy.Durability.TransientLocal) in ddsls["stdout"]
+        assert str(Policy.Userdata(data=b'HelloProfile')) in ddsls["stdout"]
+
+    pubsub = run_pubsub(["-T", "test", "--qos-profile", "missing", "--qos-file", str(filename)])
+    assert "Error: No QoS profile missing" in pubsub["stderr"]
+
+
+def test_qos_profile_entityqos(tmp_path, monkeypatch):
+    sys.path.append(os.path.join(os.path.dirname(__file__), "..", "tools", "pubsub"))
+    from qos_profile import load_profile
+
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    filename = tmp_path / "profiles.json"
+    filename.write_text(json.dumps({"writer": {"qos": ["Durability.TransientLocal"], "entityqos": "datawriter"},
+                                    "typo": {"qos": ["Durability.TransientLocal"], "entityqos": "datawritter"}}))
+
+    qos, eqos = load_profile(str(filename), "writer")
+    assert eqos == [None, None, None, Qos(Policy.Durability.TransientLocal), None]
+    with pytest.raises(SystemExit) as e:
+        load_profile(str(filename), "typo")
+    assert str(e.value) == f"Error: Invalid entityqos datawritter of QoS profile typo in {filename}"
+
+
+def test_qos_profile_cache(tmp_path, monkeypatch, capsys):
+    sys.path.append(os.path.join(os.path.dirname(__file__), "..", "tools", "pubsub"))
+    import pickle
+    from qos_profile import load_profile, cache_path
+
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    filename = tmp_path / "profiles.json"
+    filename.write_text(json.dumps({"profile": {"qos": ["WriterDataLifecycle False"]}}))
+    qos, eqos = load_profile(str(filename), "profile")
+    assert qos == Qos(Policy.WriterDataLifecycle(autodispose=False))
+    assert "is not applicable for datareader" in capsys.readouterr().out
+
+    # A cache hit returns the cached profile and prints its warnings again
+    cache_file = cache_path(str(filename))
+    with open(cache_file, "rb") as f:
+        cache = pickle.load(f)
+    cache["profiles"]["profile"] = (Qos(Policy.Userdata(data=b"cached")), eqos, "cached warning\n")
+    with open(cache_file, "wb") as f:
+        pickle.dump(cache, f)
+    assert load_profile(str(filename), "profile")[0] == Qos(Policy.Userdata(data=b"cached"))
+    assert capsys.readouterr().out == "cached warning\n"
+
+    # An edited file is compiled again
+    filename.write_text(json.dumps({"profile": {"qos": ["Durability.TransientLocal", "Userdata edited"]}}))
+    edited = Qos(Policy.Durability.TransientLocal, Policy.Userdata(data=b"edited"))
+    assert load_profile(str(filename), "profile")[0] == edited
+
+    # A corrupt cache is reported and compiled again
+    with open(cache_file, "wb") as f:
+        f.write(b"corrupt")
+    assert load_profile(str(filename), "profile")[0] == edited
+    assert "WARNING: Ignoring the QoS profile cache" in capsys.readouterr().err
+
+
 def test_multiple_qoses():
     pubsub, ddsls = run_pubsub_ddsls(["-T", "test", "--qos", "Durability.TransientLocal", "Userdata HelloWorld"],
                                      ["-a"],
@@ -404,6 +870,37 @@ def test_not_applicable_entity_qos():
     assert "Integer(seq=1, keyval=420)" in pubsub["stdout"]
 
 
+def test_entity_qos_partition():
+    sys.path.append(os.path.join(os.path.dirname(__file__), "..", "tools", "pubsub"))
+    from check_entity_qos import entity_qos
+
+    qos = Qos(Policy.Reliability.Reliable(max_blocking_time=10), Policy.Partition(partitions=("a",)))
+    topic, publisher, subscriber, writer, reader = entity_qos(qos, None)
+    assert topic == Qos(Policy.Reliability.Reliable(max_blocking_time=10))
+    assert publisher == subscriber == Qos(Policy.Partition(partitions=("a",)))
+    assert writer == reader == topic
+
+    # Every call starts from scratch, an earlier selection doesn't leak into the next one
+    assert entity_qos(qos, "datawriter") == [None, None, None, writer, None]
+
+
+def test_check_partition_wildcards():
+    sys.path.append(os.path.join(os.path.dirname(__file__), "..", "tools", "pubsub"))
+    from check_qos_compat import check_compatibility
+
+    def eqos(*partitions):
+        return [None, Qos(Policy.Partition(partitions=partitions)), Qos(Policy.Partition(partitions=partitions)),
+                None, None]
+
+    # A pattern matches a name on either side
+    assert check_compatibility(eqos("a*"), eqos("ab")) == []
+    assert check_compatibility(eqos("ab"), eqos("a?")) == []
+    assert check_compatibility(eqos("x", "a*"), eqos("ab")) == []
+    assert check_compatibility(eqos("a*"), eqos("b")) == [
+        "Partition: partitions ['b'] requested but ['a*'] offered"
+    ]
+
+
 def test_incompatible_qos():
     pubsub, ddsls_pub = run_pubsub_ddsls(["-T", "test", "-eqos", "subscriber",
                                           "--qos", "PresentationAccessScope.Instance", "False, True"],
@@ -426,6 +923,24 @@ def test_incompatible_qos():
     assert "StrSequence" not in pubsub["stdout"]
 
 
+def test_qos_compatibility_check(tmp_path):
+    pubsub = run_pubsub(["-T", "test", "--runtime", "1", "-eqos", "subscriber",
+                         "--qos", "PresentationAccessScope.Instance", "False, True"])
+    assert "WARNING: The Qos requested by the local datareader is incompatible" in pubsub["stdout"]
+    assert "PresentationAccessScope: ordered access requested but not offered" in pubsub["stdout"]
+
+    pubsub = run_pubsub(["-T", "test", "-eqos", "subscriber",
+                         "--qos", "PresentationAccessScope.Instance", "False, True", "--check-qos"])
+    assert pubsub["status"] != 0
+    assert "Error: The Qos requested by the local datareader is incompatible" in pubsub["stderr"]
+
+    filename = tmp_path / "profiles.json"
+    filename.write_text(json.dumps({"durable": {"qos": ["Durability.TransientLocal"], "entityqos": "datareader"}}))
+    pubsub = run_pubsub(["-T", "test", "--check-qos", "durable", "--qos-file", str(filename)])
+    assert "Error: The Qos requested by the datareader of profile durable is incompatible" in pubsub["stderr"]
+    assert "Durability: TransientLocal requested but Volatile offered" in pubsub["stderr"]
+
+
 def test_qos_help():
     pubsub = run_pubsub(["--qoshelp"])
     assert "Available QoS and usage" in pubsub["stdout"]
@@ -485,3 +1000,16 @@ def test_input_data_error_msg():
     new_msg = "[1,'hello',2]"
     pubsub = run_pubsub(["-T", "test"], text=new_msg)
     assert "Exception: TypeError: Element type inconsistent" in pubsub["stderr"]
+
+    pubsub = run_pubsub(["-T", "test"], text="[1, 2")
+    assert "Exception: Invalid input: unterminated list" in pubsub["stderr"]
+
+
+def test_input_type_dispatch():
+    pubsub = run_pubsub(["-T", "test", "--runtime", "1"], text="[1, 2, 3] [1, 2] ['a', 'b']")
+    assert "IntArray(seq=0, keyval=[1, 2, 3])" in pubsub["stdout"]
+    assert "IntSequence(seq=1, keyval=[1, 2])" in pubsub["stdout"]
+    assert "StrSequence(seq=2, keyval=['a', 'b'])" in pubsub["stdout"]
+
+    pubsub = run_pubsub(["-T", "test"], text="[[1, 2]]")
+    assert "Exception: TypeError: Unsupported input [[1, 2]]" in pubsub["stderr"]
@@ -0,0 +1,69 @@
+import re
+
+
+# One token per match: a list delimiter or separator, a quoted string, an integer or an unquoted string
+_token = re.compile(r"""\s*(?:([\[\],])|'([^']*)'|"([^"]*)"|([-+]?\d+)(?![^\s\[\],'"])|([^\s\[\],'"]+))""")
+_whitespace = re.compile(r"\s*")
+
+
+class Tokenizer:
+    def __init__(self):
+        self.buffer = ""  # unfinished input of the previous chunk
+        self.lists = []   # lists that are still open
+
+    # Parse a chunk of input and return the completed values, unfinished tokens are kept for the next chunk
+    def feed(self, text, final=False):
+        data = self.buffer + text if self.buffer else text
+        end = len(data)
+        pos = 0
+        values = []
+        lists = self.lists
+        match = _token.match
+
+        while True:
+            m = match(data, pos)
+            if m is None:  # Only whitespace or an unterminated quoted string left
+                break
+            group = m.lastindex
+            if group >= 4 and m.end() == end and not final:  # The word may continue in the next chunk
+                break
+            pos = m.end()
+
+            if group == 1:
+                char = m.group(1)
+                if char == "[":
+                    lists.append([])
+                    continue
+                elif char == ",":
+                    continue
+                elif not lists:
+                    raise Exception("Invalid input: unexpected ']'")
+                value = lists.pop()
+            elif group == 4:
+                value = int(m.group(4))
+            else:
+                value = m.group(group)
+
+            if lists:
+                lists[-1].append(value)
+            else:
+                values.append(value)
+
+        self.buffer = data[_whitespace.match(data, pos).end():]
+        return values
+
+    # Parse the remaining input at the end of the stream
+    def finish(self):
+        values = self.feed("", final=True)
+        if self.buffer:
+            raise Exception(f"Invalid input: unterminated string {self.buffer}")
+        if self.lists:
+            raise Exception("Invalid input: unterminated list")
+        return values
+
+
+def tokenize(stream):
+    tokenizer = Tokenizer()
+    for line in stream:
+        yield from tokenizer.feed(line)
+    yield from tokenizer.finish()
@@ -2,8 +2,12 @@ from cyclonedds.core import Qos
 from dataclasses import fields
 import typing
 import sys
+import importlib.util
 import argparse
 
+from pubsub_topic import topic_types
+from registry import TypeRegistry
+
 
 def qos_help():
     name_map = {
@@ -46,10 +50,38 @@ qos_help_msg = str(f"""e.g.:
     \rAvailable QoS and usage are:\n {' '.join(map(str, qos_help()))}\n""")
 
 
+def type_list(value):
+    types = [name.strip() for name in value.split(",") if name.strip()]
+    for name in types:
+        if name not in topic_types:
+            raise argparse.ArgumentTypeError(f"invalid type '{name}' (choose from {', '.join(topic_types)})")
+    return types
+
+
+# Expand '@FILE' arguments to the topic names in the file, dropping duplicates
+def topic_list(names):
+    topics = []
+    for name in names:
+        if name.startswith("@"):
+            try:
+                with open(name[1:]) as f:
+                    expanded = [line.strip() for line in f if line.strip()]
+            except OSError:
+                raise SystemExit(f"Error: Could not open file {name[1:]}")
+        else:
+            expanded = [name]
+        for topic in expanded:
+            if topic not in topics:
+                topics.append(topic)
+    return topics
+
+
 def create_parser(args):
     parser = argparse.ArgumentParser(formatter_class=argparse.RawTextHelpFormatter)
     group = parser.add_mutually_exclusive_group(required=True)
-    group.add_argument("-T", "--topic", type=str, help="The name of the topic to publish/subscribe to")
+    group.add_argument("-T", "--topic", type=str, nargs="+",
+                       help="""The name(s) of the topic(s) to publish/subscribe to, '@FILE' reads the names from a file
+with one name per line. Multiple topics share one participant.""")
     parser.add_argument("-eqos", "--entityqos", choices=["all", "topic", "publisher", "subscriber",
                         "datawriter", "datareader"], help="""Select the entites to set the qos.
 Choose between all entities, topic, publisher, subscriber, datawriter and datareader. (default: all).
@@ -57,13 +89,144 @@ Inapplicable qos will be ignored.""")
     parser.add_argument("-q", "--qos", nargs="+",
                         help="Set QoS for entities, check '--qoshelp' for available QoS and usage\n")
     group.add_argument("--qoshelp", action="store_true", help=qos_help_msg)
+    parser.add_argument("--qos-profile", type=str, metavar="NAME",
+                        help="Use a named QoS profile of --qos-file instead of --qos and --entityqos. The parsed\n" +
+                        "profiles are cached on disk until the file changes, so later launches don't parse them.")
+    parser.add_argument("--check-qos", nargs="*", metavar="PROFILE",
+                        help="Exit when the QoS of the local datawriters and datareaders are incompatible, instead\n" +
+                        "of warning, explaining every incompatible policy. The named profiles of --qos-file are\n" +
+                        "checked as remote endpoints as well.")
+    parser.add_argument("--qos-file", type=str, metavar="FILE",
+                        help="JSON or TOML file of QoS profiles: {\"NAME\": {\"qos\": [QOS...], \"entityqos\": ENTITY}}")
+    parser.add_argument("--domain", type=int, default=0, metavar="ID", help="DDS domain ID. (default: 0)")
     parser.add_argument("-r", "--runtime", type=float, help="Limit the runtime of the tool, in seconds.")
-    if len(sys.argv) == 1:
+    entities = parser.add_mutually_exclusive_group()
+    entities.add_argument("--types", type=type_list, metavar="TYPE[,TYPE...]",
+                          help="""Only create the entities of these types at startup, others are created when first written.
+Choose from int, str, int_array, str_array, int_seq, str_seq and blob. (default: all)""")
+    entities.add_argument("--lazy", action="store_true",
+                          help="Don't create any entities at startup, create them when their type is first written.")
+    keyed = parser.add_argument_group("instances")
+    keyed.add_argument("--instances", type=int, metavar="K",
+                       help="Use keyed types on 'keyed_' topics and spread the writes round-robin over K instances.\n" +
+                       "The instances are registered upfront and the output shows their instance state.")
+    keyed.add_argument("--instance-exit", choices=["dispose", "unregister"],
+                       help="Dispose or unregister all instances when pubsub exits.")
+    parser.add_argument("--type-module", type=str, metavar="MODULE",
+                        help="Publish and subscribe to the @cdr classes of a Python module or .py file instead of the\n" +
+                        "built-in types, on topic + class name. The input is one JSON object per line with the\n" +
+                        "fields of a sample and the class name in \"type\", optional for a single class.")
+    parser.add_argument("--threads", type=int, default=1, metavar="N",
+                        help="Service the topics with a pool of N threads. (default: 1)")
+    parser.add_argument("-b", "--batch", type=int, metavar="N",
+                        help="Collect up to N input values and write them as one batch, report the write rate at exit.")
+    rate = parser.add_argument_group("rate")
+    rate.add_argument("--rate", type=float, metavar="X",
+                      help="Write at most X input values per second on a fixed schedule, values that are late are\n" +
+                      "written right away instead of skipped. Reports the achieved rate at exit. With --workers\n" +
+                      "the rate is shared by all workers.")
+    rate.add_argument("--burst", type=int, default=1, metavar="N",
+                      help="Write up to N values at once ahead of the schedule. (default: 1)")
+    output = parser.add_argument_group("output")
+    output.add_argument("--format", choices=["text", "ndjson", "csv"], default="text",
+                        help="Output format of the received samples. (default: text)")
+    output.add_argument("-o", "--output", type=str, metavar="FILE", help="Write the received samples to a file.")
+    output.add_argument("--flush-interval", type=float, default=0.1, metavar="SECONDS",
+                        help="Buffer the output for at most this long before writing it. (default: 0.1)")
+    output.add_argument("--summary", type=float, metavar="SECONDS",
+                        help="Only print the number of received samples per type every SECONDS.")
+    output.add_argument("--stats", type=float, metavar="SECONDS",
+                        help="Print the received samples and bytes, duplicates, out-of-order samples and samples lost\n" +
+                        "according to their seq per topic to stderr every SECONDS, and per writer at exit.")
+    output.add_argument("--latency", type=float, metavar="SECONDS",
+                        help="Publish and subscribe to timed types, which carry their send time, and print the\n" +
+                        "latency percentiles per topic to stderr every SECONDS and at exit. The clocks of the\n" +
+                        "publishing and subscribing hosts should be synchronized.")
+    output.add_argument("--numpy", action="store_true",
+                        help="Take the received integer arrays and sequences as NumPy arrays. Requires NumPy.")
+    replay = parser.add_argument_group("replay")
+    replay.add_argument("-i", "--input-file", type=str, metavar="FILE",
+                        help="Read the input from a memory-mapped file instead of stdin. A line '@<seconds>' delays\n" +
+                        "the following lines until that time after the start of the replay. A NumPy '.npy' file\n" +
+                        "is published row by row, as integer or string arrays and sequences.")
+    replay.add_argument("--blob-size", type=int, metavar="N",
+                        help="Publish the input file as blobs of N bytes, straight from the memory map,\n" +
+                        "instead of parsing it.")
+    replay.add_argument("--loop", type=int, default=1, metavar="N",
+                        help="Replay the input file N times, 0 to repeat it forever. (default: 1)")
+    replay.add_argument("--replay-rate", type=float, default=1.0, metavar="X",
+                        help="Replay the input file X times as fast as its '@<seconds>' timing,\n" +
+                        "0 to ignore the timing. (default: 1)")
+    bench = parser.add_argument_group("benchmark")
+    bench.add_argument("--bench", action="store_true",
+                       help="Write synthetic samples of every type (or --types) and report the write and receive\n" +
+                       "rates and latency percentiles in JSON, instead of reading stdin.")
+    bench.add_argument("--bench-count", type=int, default=10000, metavar="N",
+                       help="Number of samples written per type. (default: 10000)")
+    bench.add_argument("--bench-size", type=int, default=16, metavar="N",
+                       help="Number of elements of the sequences, characters of the strings and bytes of the blobs.\n" +
+                       "(default: 16)")
+    bench.add_argument("--bench-output", type=str, metavar="FILE", help="Write the benchmark results to a file.")
+    bench.add_argument("--workers", type=int, metavar="N",
+                       help="Generate load from N processes with their own participant, like --bench but for --runtime\n" +
+                       "seconds. Prints the combined rates every second and a JSON report at the end.")
+    if not args:
         parser.print_help(sys.stderr)
     args = parser.parse_args(args)
     if args.qoshelp:
         print(qos_help_msg)
         sys.exit(0)
+    if args.topic:
+        args.topic = topic_list(args.topic)
+    if not 0 <= args.domain <= 232:
+        raise SystemExit("Error: The domain ID should be between 0 and 232")
     if args.entityqos and not args.qos:
         raise SystemExit("Error: The following argument is required: -q/--qos")
+    if args.qos_profile and args.qos:
+        raise SystemExit("Error: --qos-profile can't be combined with --qos")
+    if (args.qos_profile or args.check_qos) and not args.qos_file:
+        raise SystemExit("Error: The following argument is required: --qos-file")
+    if (args.loop != 1 or args.replay_rate != 1.0) and not args.input_file:
+        raise SystemExit("Error: The following argument is required: -i/--input-file")
+    if args.blob_size is not None and not args.input_file:
+        raise SystemExit("Error: The following argument is required: -i/--input-file")
+    if args.blob_size is not None and args.blob_size < 1:
+        raise SystemExit("Error: The blob size should be at least 1")
+    # Blobs and NumPy rows have no '@<seconds>' timing to replay
+    if args.replay_rate != 1.0 and (args.blob_size or (args.input_file or "").endswith(".npy")):
+        raise SystemExit("Error: --replay-rate can't be combined with --blob-size or a '.npy' input file")
+    if (args.numpy or (args.input_file or "").endswith(".npy")) and not importlib.util.find_spec("numpy"):
+        raise SystemExit("Error: NumPy is not installed")
+    if args.loop < 0 or args.replay_rate < 0:
+        raise SystemExit("Error: --loop and --replay-rate can't be negative")
+    if args.instances is not None and args.instances < 1:
+        raise SystemExit("Error: The number of instances should be at least 1")
+    if args.instance_exit and not args.instances:
+        raise SystemExit("Error: The following argument is required: --instances")
+    if args.workers is not None and args.workers < 1:
+        raise SystemExit("Error: The number of workers should be at least 1")
+    if args.threads < 1:
+        raise SystemExit("Error: The number of threads should be at least 1")
+    if args.summary is not None and args.summary <= 0:
+        raise SystemExit("Error: The summary interval should be positive")
+    if args.stats is not None and args.stats <= 0:
+        raise SystemExit("Error: The stats interval should be positive")
+    if args.latency is not None and args.latency <= 0:
+        raise SystemExit("Error: The latency interval should be positive")
+    if args.latency and args.instances:
+        raise SystemExit("Error: --latency can't be combined with --instances")
+    if args.type_module and (args.types or args.instances or args.latency or args.blob_size or args.bench or
+                             args.workers):
+        raise SystemExit("Error: --type-module can't be combined with --types, --instances, --latency, " +
+                         "--blob-size, --bench or --workers")
+    # The user types are loaded once, every TopicManager shares them
+    args.registry = TypeRegistry(args.type_module) if args.type_module else None
+    if args.batch is not None and args.batch < 1:
+        raise SystemExit("Error: The batch size should be at least 1")
+    if args.rate is not None and args.rate <= 0:
+        raise SystemExit("Error: The rate should be positive")
+    if args.burst != 1 and not args.rate:
+        raise SystemExit("Error: The following argument is required: --rate")
+    if args.burst < 1:
+        raise SystemExit("Error: The burst size should be at least 1")
     return args
@@ -0,0 +1,160 @@
+import sys
+import time
+import queue
+import multiprocessing
+
+from bench import bench_value, write_results
+from histogram import LatencyHistogram
+from rate import RateLimiter
+from pubsub_topic import TopicManager, topic_types
+from cyclonedds.core import WaitSet
+from cyclonedds.domain import DomainParticipant
+from cyclonedds.util import duration
+from cyclonedds.qos import Qos, Policy
+
+
+seq_bits = 40  # The seq of a worker starts at its index << seq_bits, so every worker recognizes its own samples
+report_interval = 1
+
+
+# Load generating process: write synthetic samples as fast as possible or at --rate, report the counters every interval
+def worker(index, args, eqos, reports, stop):
+    dp = DomainParticipant(args.domain, qos=Qos(Policy.IgnoreLocal.Process))
+    waitset = WaitSet(dp)
+    managers = [TopicManager(args, dp, eqos, waitset, topic) for topic in args.topic]
+    values = [(name, bench_value(name, args.bench_size)) for name in args.types or topic_types]
+    sent = []  # seq -> send time in ns, per topic
+    for manager in managers:
+        manager.seq = (index << seq_bits) - 1
+        sent.append({})
+
+    # The workers share the rate, a late write is measured from the time it was due
+    limiter = RateLimiter(args.rate / args.workers, args.burst) if args.rate else None
+    histogram = LatencyHistogram()
+    written = received = 0
+    next_report = time.monotonic() + report_interval
+    i = 0
+    try:
+        while not stop.is_set():
+            if limiter:
+                count = min(limiter.due(), 100)
+                if not count:  # Wait for the next write, samples that arrive meanwhile are taken right away
+                    waitset.wait(duration(seconds=min(limiter.timeout(), report_interval)))
+            else:
+                count = 100
+            for _ in range(count):
+                name, value = values[i % len(values)]
+                time_due = limiter.scheduled(limiter.sent) if limiter else None
+                for manager, times in zip(managers, sent):
+                    times[manager.seq + 1] = time_due or time.perf_counter_ns()
+                    manager.write_value(name, value)
+                if limiter:
+                    limiter.sent_count(1)
+                i += 1
+            written += count * len(managers)
+
+            for manager, times in zip(managers, sent):
+                for sample in manager.take():
+                    received += 1
+                    time_sent = times.pop(sample.seq, None)
+                    if time_sent is not None:
+                        histogram.record(time.perf_counter_ns() - time_sent)
+                # Forget the oldest lost samples
+                while len(times) > 100000:
+                    del times[next(iter(times))]
+
+            if time.monotonic() >= next_report:
+                reports.put((index, written, received, histogram))
+                histogram = LatencyHistogram()
+                written = received = 0
+                next_report += report_interval
+    except KeyboardInterrupt:  # The coordinator stops the workers
+        pass
+    reports.put((index, written, received, histogram))
+    reports.put((index, None, None, None))
+
+
+class Coordinator:
+    def __init__(self, target=None):
+        self.target = target  # samples/s written by all workers with --rate
+        self.time_start = time.monotonic()
+        self.last_report = self.time_start
+        self.written = self.received = 0
+        self.interval_written = self.interval_received = 0
+        self.histogram = LatencyHistogram()
+        self.interval_histogram = LatencyHistogram()
+
+    def add(self, written, received, histogram):
+        self.interval_written += written
+        self.interval_received += received
+        self.interval_histogram.merge(histogram)
+
+    # Print the counters of all workers since the last report to stderr
+    def report(self):
+        now = time.monotonic()
+        interval = (now - self.last_report) or 1
+        self.last_report = now
+        latency = {k: v or 0 for k, v in self.interval_histogram.summary_us().items()}
+        target = f" (target {self.target:.0f}/s)" if self.target else ""
+        print(f"{now - self.time_start:6.1f}s written {self.interval_written / interval:.0f}/s{target} " +
+              f"received {self.interval_received / interval:.0f}/s latency p50 {latency['p50']:.1f}us " +
+              f"p99 {latency['p99']:.1f}us max {latency['max']:.1f}us", file=sys.stderr)
+        self.written += self.interval_written
+        self.received += self.interval_received
+        self.histogram.merge(self.interval_histogram)
+        self.interval_written = self.interval_received = 0
+        self.interval_histogram = LatencyHistogram()
+
+
+def run_workers(args, qos, eqos):
+    context = multiprocessing.get_context("fork")
+    reports = context.Queue()
+    stop = context.Event()
+    processes = [context.Process(target=worker, args=(index, args, eqos, reports, stop), daemon=True)
+                 for index in range(args.workers)]
+    for process in processes:
+        process.start()
+
+    # Every value is written to all topics
+    coordinator = Coordinator(args.rate * len(args.topic) if args.rate else None)
+    time_start = coordinator.time_start
+    next_report = time_start + report_interval
+    running = len(processes)
+    while running:
+        try:
+            now = time.monotonic()
+            if args.runtime and now - time_start >= args.runtime:
+                stop.set()
+            if now >= next_report:
+                coordinator.report()
+                next_report += report_interval
+            try:
+                index, written, received, histogram = reports.get(timeout=max(next_report - now, 0))
+            except queue.Empty:
+                if not any(process.is_alive() for process in processes):  # Workers that failed don't report
+                    break
+                continue
+            if written is None:
+                running -= 1
+            else:
+                coordinator.add(written, received, histogram)
+        except KeyboardInterrupt:
+            stop.set()
+    for process in processes:
+        process.join()
+
+    coordinator.report()
+    elapsed = coordinator.last_report - time_start
+    write_results({
+        "workers": args.workers,
+        "topics": args.topic,
+        "qos": [str(policy) for policy in qos] if qos else [],
+        "duration": elapsed,
+        "written": coordinator.written,
+        "received": coordinator.received,
+        "target_rate": coordinator.target,
+        "write_rate": coordinator.written / elapsed,
+        "receive_rate": coordinator.received / elapsed,
+        "latency_us": coordinator.histogram.summary_us()
+    }, args.bench_output)
+    return 0